@@ -1,8 +1,12 @@
 from subprocess import Popen, PIPE
+from collections import deque
 import select
 import fcntl, os
+import threading
 import time
 
+STDERR_LIMIT = 64 * 1024  # bytes of the AI's stderr kept, older output is dropped
+
 class Communicator(object):
     def __init__(self, command,timeout):
         self.timeout = timeout
@@ -10,33 +14,73 @@ class Communicator(object):
         flags = fcntl.fcntl(self.process.stdout, fcntl.F_GETFL)
         fcntl.fcntl(self.process.stdout, fcntl.F_SETFL, flags | os.O_NONBLOCK)
         self.accumulated_time = 0
+        self.buffer = b''  # stdout read past the last complete line
+        # stderr is read all the time by a thread, so the AI never blocks on a full pipe, and its tail is kept
+        self.stderr_chunks = deque()
+        self.stderr_size = 0
+        self.stderr_lock = threading.Lock()
+        self.stderr_thread = threading.Thread(target=self.drain_stderr, daemon=True)
+        self.stderr_thread.start()
+
+    def drain_stderr(self):
+        fd = self.process.stderr.fileno()
+        while True:
+            try:
+                chunk = os.read(fd, 65536)
+            except OSError:
+                break
+            if not chunk:
+                break
+            with self.stderr_lock:
+                self.stderr_chunks.append(chunk)
+                self.stderr_size += len(chunk)
+                while self.stderr_size - len(self.stderr_chunks[0]) >= STDERR_LIMIT:
+                    self.stderr_size -= len(self.stderr_chunks.popleft())
+
+    def stderr_tail(self):
+        # the last STDERR_LIMIT or so bytes the AI wrote to stderr, e.g. for a crash report
+        with self.stderr_lock:
+            return b''.join(self.stderr_chunks)[-STDERR_LIMIT:]
 
     def send(self, data, tail = '\n'.encode()):
         self.process.stdin.write(data + tail)
         self.process.stdin.flush()
-        time.sleep(0.01)
 
     def recv(self,t=0.2,return_stderr=False,time_already=None):
+        # t was the polling interval, recv now waits in select until the AI answers
         if time_already is not None:
             DeprecationWarning("time_already parameter has been deprecated, and it will be removed soon.")
-        r = ''
-        pr = self.process.stdout
-        per = self.process.stderr
-        bt = time.time()
+        fd = self.process.stdout.fileno()
+        bt = time.perf_counter()
         er = b''
-        while ((time.time() - bt)+self.accumulated_time < self.timeout):
-            if not select.select([pr], [], [], 0)[0]:
-                time.sleep(t)
+        while True:
+            remaining = self.timeout - self.accumulated_time - (time.perf_counter() - bt)
+            if remaining <= 0:
+                self.accumulated_time += time.perf_counter() - bt
+                raise TimeoutError
+            if not select.select([fd], [], [], remaining)[0]:
                 continue
-
-            r = pr.read().rstrip()
-            self.accumulated_time += time.time() - bt
+            chunk = os.read(fd, 65536)
+            if chunk:
+                self.buffer += chunk
+                end = self.buffer.rfind(b'\n')
+                if end == -1:
+                    # only part of a line so far, wait for the rest of it
+                    continue
+                r = self.buffer[:end].rstrip()
+                self.buffer = self.buffer[end + 1:]
+            else:
+                # the AI closed its stdout, it has exited or crashed
+                r = self.buffer.rstrip()
+                self.buffer = b''
+            self.accumulated_time += time.perf_counter() - bt
             if r.decode() == ' ' or r.decode() == '':
-                er = per.read()
+                # no answer, the AI has most likely crashed, so wait for the rest of its traceback
+                self.stderr_thread.join(1)
+                er = self.stderr_tail()
             if return_stderr:
                 return r,er
             return r
-        raise TimeoutError
 
     def close(self):
         self.process.kill()
@@ -3,6 +3,10 @@ sys.path.append("../")
 from AI_Extensions.Communicator import Communicator
 from BoardClasses import Move
 
+# the command TournamentInterface in GameLogic takes to start a new game, and its answer
+NEW_GAME = "new_game"
+READY = "ready"
+
 
 def get_prefix(ai):
     if ai.endswith('.exe'):
@@ -31,5 +35,14 @@ class IOAI():
         ai_move = ai_move.decode().split("\n")[-1].rstrip()
         return Move.from_str(ai_move)
 
+    def new_game(self,col,row,p):
+        # starts another game in the same AI process, which gets its whole time again
+        self.communicator.send((NEW_GAME + " %d %d %d" % (col, row, p)).encode())
+        self.communicator.accumulated_time = 0
+        reply,err = self.communicator.recv(return_stderr=True)
+        if reply.decode().strip() != READY:
+            raise Exception(err.decode() or "no new game support, the AI answered " + repr(reply.decode()))
+        self.communicator.accumulated_time = 0
+
     def close(self):
         self.communicator.close()
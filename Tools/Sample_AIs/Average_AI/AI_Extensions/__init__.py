@@ -1,3 +1,4 @@
 from AI_Extensions.Network_AI import NetworkAI
 from AI_Extensions.IOAI import IOAI
-from AI_Extensions.Communicator import Communicator
\ No newline at end of file
+from AI_Extensions.Communicator import Communicator
+from AI_Extensions.InProcessAI import InProcessAI
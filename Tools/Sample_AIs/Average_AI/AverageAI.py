@@ -1,76 +1,235 @@
 from random import randint
 from BoardClasses import Move
 from BoardClasses import Board
+from BitBoard import BitBoard
+from TranspositionTable import TranspositionTable, EXACT, LOWER, UPPER
 import copy
 import math
+import os
+import time
+
+# Set to True to search on the integer-mask BitBoard engine instead of the Checker grid Board.
+USE_BITBOARD = False
+# Memory cap of the transposition table shared by all the searches of a game.
+TT_MEMORY = 32 * 1024 * 1024
+# Seconds the game gives this AI in total, the 1200 AI_Runner and main.py pass to IOAI's Communicator.
+# A harness with another clock sets it in the GAME_TIME_ENV environment variable, which runner.py does
+# with its --time, or passes game_time to StudentAI.
+GAME_TIME = 1200
+GAME_TIME_ENV = "CHECKERS_GAME_TIME"
+# Part of the game time kept back for the process and pipe overhead Communicator also counts.
+TIME_RESERVE = 0.05
+# Our moves left in the game are estimated as the pieces left on the board, and the remaining time is split
+# over at least this many moves, so the clock never runs out in a long game.
+MIN_MOVES_TO_GO = 10
+# Deepest iteration, reached only when the game tree is small enough to be searched to the end.
+MAX_DEPTH = 50
+# Set to a depth to search every move to exactly that depth without the clock, e.g. to compare node counts.
+FIXED_DEPTH = None
+# Set to False to search moves in board-scan order, with only the transposition table move first.
+MOVE_ORDERING = True
+
+
+class SearchTimeout(Exception):
+    """
+    Raised inside the search when the time of the move is up, to unwind to get_move
+    """
+    pass
 
 
 # The following part should be completed by students.
 # Students can modify anything except the class name and exisiting functions and varibles.
 class StudentAI():
 
-    def __init__(self, col, row, k):
+    def __init__(self, col, row, k, game_time=None):
         self.col = col
         self.row = row
         self.k = k
-        self.board = Board(col, row, k)
+        self.board = BitBoard(col, row, k) if USE_BITBOARD else Board(col, row, k)
         self.board.initialize_game()
         self.color = ''
         self.oppoent = {1: 2, 2: 1}
         self.color = 2
+        self.tt = TranspositionTable(TT_MEMORY)
+        self.nodes = 0  # MinValue/MaxValue calls of the last get_move
+        self.total_nodes = 0  # MinValue/MaxValue calls of the whole game
+        self.root_depth = 0  # depth of the iteration being searched, to turn remaining depth into ply
+        self.killers = [[None, None] for _ in range(MAX_DEPTH + 2)]  # per ply, seqs of quiet moves that caused a cutoff
+        self.history = {}  # (from, to) -> how often and how deep that quiet move caused a cutoff
+        self.game_time = game_time or float(os.environ.get(GAME_TIME_ENV, GAME_TIME))  # seconds on our clock
+        self.time_used = 0.0  # seconds spent in get_move so far this game
+        self.moves_played = 0
+        self.deadline = None  # time.time() at which the current search is aborted
+        self.budget = 0.0  # seconds the last get_move was given for its search, 0 if it did not search
+        self.root_best = None  # best root move of the iteration being searched, among the moves searched so far
+        self.depth_reached = 0  # deepest completed iteration of the last get_move
+        self.tt_color = None  # color the scores in the transposition table are for
+
+    def new_game(self):
+        """
+        Gets ready for another game on the same board, when a tournament plays several games in one process.
+        The transposition table and the move cache of the board are kept for the positions that come up again.
+        """
+        move_cache = self.board.move_cache
+        self.board = BitBoard(self.col, self.row, self.k) if USE_BITBOARD else Board(self.col, self.row, self.k)
+        self.board.initialize_game()
+        self.board.move_cache = move_cache
+        self.color = 2
+        self.history = {}
+        self.time_used = 0.0
+        self.moves_played = 0
+        self.total_nodes = 0
+
+    def move_time(self):
+        """
+        Splits the time left on the game clock over the moves expected to be left in this game, about one
+        for every piece still on the board
+        """
+        remaining = self.game_time * (1 - TIME_RESERVE) - self.time_used
+        moves_to_go = max(MIN_MOVES_TO_GO, self.board.black_count + self.board.white_count)
+        return max(0.0, remaining / moves_to_go)
 
     def get_move(self, move):
+        start = time.time()
         if len(move) != 0:
-            max_depth = 7
             self.board.make_move(move, self.oppoent[self.color])
         else:
-            max_depth = 4
             self.color = 1
         self.board.saved_move = []
-        moves = self.board.get_all_possible_moves(self.color)
-        bestScore = -100000000000000000000
-        bestMove = None
-        ### check if moves has something
-        if moves is not None:
-            for index in range(len(moves)):
-                for inner_index in range(len(moves[index])):
-#                    copy_board = copy.deepcopy(self.board)
-#                    copy_board.make_move(moves[index][inner_index], self.color)
-                    self.board.make_move(moves[index][inner_index],self.color)
-                    color = self.oppoent[self.color]
-                    moveScore = self.alphaBeta(self.board, max_depth, color)
-#                    moveScore = self.alphaBeta(copy_board, max_depth, color)                    
-                    if bestScore < moveScore:
-                        bestScore = moveScore
-                        bestMove = moves[index][inner_index]
-                    self.board.undo()
+        if self.tt_color != self.color:
+            # scores are stored for one side, those of a game played with the other color are wrong
+            self.tt.clear()
+            self.tt_color = self.color
+        self.tt.new_search()
+        self.nodes = 0
+        self.depth_reached = 0
+        # plies shift by two between our moves, so the killers are dropped and the history is aged
+        self.killers = [[None, None] for _ in range(MAX_DEPTH + 2)]
+        for key in self.history:
+            self.history[key] //= 2
+        moves = [move for checker_moves in self.board.get_all_possible_moves(self.color) for move in checker_moves]
+        bestMove = moves[0] if moves else None
+        self.budget = 0.0
+        if len(moves) > 1:
+            budget = self.budget = self.move_time()
+            self.deadline = start + budget if FIXED_DEPTH is None else None
+            ply = self.board.snapshot()
+            # deepens until the time of the move is up, the last iteration is cut off by the deadline
+            for depth in range(1, (FIXED_DEPTH or MAX_DEPTH) + 1):
+                try:
+                    bestMove, bestScore = self.search_root(moves, depth)
+                except SearchTimeout:
+                    # the iteration was cut off, the moves it was in the middle of are taken back
+                    self.board.restore(ply)
+                    if MOVE_ORDERING and self.root_best is not None:
+                        # the best move so far was searched first, a move that beat it at this depth is better
+                        bestMove = self.root_best
+                    break
+                self.depth_reached = depth
+                if MOVE_ORDERING:
+                    # the best move of this iteration is searched first in the next one
+                    moves.insert(0, moves.pop(moves.index(bestMove)))
+                if bestScore >= 1000000000000000:
+                    break
+            self.deadline = None
 
         if bestMove is not None:
             self.board.make_move(bestMove, self.color)
-
+        self.moves_played += 1
+        self.total_nodes += self.nodes
+        self.time_used += time.time() - start
         return bestMove
 
+    def search_root(self, moves, max_depth):
+        """
+        Searches every root move to max_depth and returns the best one with its score. The best move of the
+        root moves searched so far is kept in root_best, for when the search is cut off.
+        """
+        bestScore = -100000000000000000000
+        bestMove = None
+        self.root_depth = max_depth
+        self.root_best = None
+        for move in moves:
+            self.board.make_move(move, self.color)
+            color = self.oppoent[self.color]
+            moveScore = self.alphaBeta(self.board, max_depth, color)
+            if bestScore < moveScore:
+                bestScore = moveScore
+                bestMove = move
+                self.root_best = move
+            self.board.undo()
+        return bestMove, bestScore
+
     def alphaBeta(self, c_board, depth, color):
         alpha, beta = -10000000000, 10000000000
-        if c_board.is_win(color) == self.color:
+        win_num = c_board.is_win(color)
+        if win_num == self.color:
             return 1000000000000000
-        elif c_board.is_win(color) == self.oppoent[self.color]:
+        elif win_num == self.oppoent[self.color]:
             return -1000000000000000
         else:
-            moves = c_board.get_all_possible_moves(color)
-            for index in range(len(moves)):
-                for inner_index in range(len(moves[index])):
-####                    copy_board = copy.deepcopy(c_board)
-####                    copy_board.make_move(moves[index][inner_index], color)
-##                    v = self.MinValue(depth - 1, alpha, beta, copy_board, self.oppoent[color])
-                    c_board.make_move(moves[index][inner_index],color)
-                    v = self.MinValue(depth - 1, alpha, beta, c_board, self.oppoent[color])
-                    c_board.undo()
-                    if v > alpha:
-                        alpha = v
+            moves = self.ordered_moves(c_board.get_all_possible_moves(color), None, 1)
+            for move in moves:
+####                copy_board = copy.deepcopy(c_board)
+####                copy_board.make_move(move, color)
+##                v = self.MinValue(depth - 1, alpha, beta, copy_board, self.oppoent[color])
+                c_board.make_move(move,color)
+                v = self.MinValue(depth - 1, alpha, beta, c_board, self.oppoent[color])
+                c_board.undo()
+                if v > alpha:
+                    alpha = v
             return alpha
 
+    def ordered_moves(self, moves, first, ply):
+        """
+        Flattens the per-checker move lists into search order: the best move stored for this position,
+        then captures by number of pieces taken, then the killer moves of this ply, then quiet moves by
+        their history score
+        """
+        flat = [move for checker_moves in moves for move in checker_moves]
+        if MOVE_ORDERING and len(flat) > 1:
+            killers = self.killers[ply]
+            history = self.history
+            ranked = []
+            for i, move in enumerate(flat):
+                seq = move.seq
+                if first is not None and seq == first.seq:
+                    rank = 3
+                elif abs(seq[0][0] - seq[1][0]) > 1:
+                    rank = 2
+                elif seq == killers[0] or seq == killers[1]:
+                    rank = 1
+                else:
+                    rank = 0
+                # captures are compared by length, quiet moves by history, -i keeps scan order for ties
+                ranked.append((rank, len(seq) if rank == 2 else history.get((seq[0], seq[-1]), 0), -i, move))
+            ranked.sort(reverse=True, key=lambda entry: entry[:3])
+            return [entry[3] for entry in ranked]
+        if first is not None:
+            for i in range(len(flat)):
+                if flat[i].seq == first.seq:
+                    flat.insert(0, flat.pop(i))
+                    break
+        return flat
+
+    def cutoff(self, move, ply, depth):
+        """
+        Remembers a quiet move that caused a beta cutoff as a killer of its ply and in the history table
+        """
+        seq = move.seq
+        if abs(seq[0][0] - seq[1][0]) > 1:
+            return
+        killers = self.killers[ply]
+        if killers[0] != seq:
+            killers[1] = killers[0]
+            killers[0] = seq
+        key = (seq[0], seq[-1])
+        self.history[key] = self.history.get(key, 0) + depth * depth
+
     def MinValue(self, depth, alpha, beta, c_board, color):
+        self.nodes += 1
+        if self.deadline is not None and time.time() > self.deadline:
+            raise SearchTimeout()
         win_num = c_board.is_win(color)
         if win_num == self.color:
             return 1000000000000000
@@ -80,20 +239,33 @@ class StudentAI():
             if depth == 0:
                 return self.score(color, c_board) #- self.score(self.oppoent[color], c_board)
             else:
-                moves = c_board.get_all_possible_moves(color)
-                for index in range(len(moves)):
-                    for inner_index in range(len(moves[index])):
-##                        copy_board = copy.deepcopy(c_board)
-##                        copy_board.make_move(moves[index][inner_index], color)
-##                        beta = min(beta, self.MaxValue(depth - 1, alpha, beta, copy_board, self.oppoent[color]))
-                        c_board.make_move(moves[index][inner_index], color)
-                        beta = min(beta, self.MaxValue(depth - 1, alpha, beta, c_board, self.oppoent[color]))
-                        c_board.undo()
-                        if alpha >= beta:
-                            return beta
+                key = c_board.zobrist_key
+                tt_score, tt_move = self.tt.lookup(key, depth, alpha, beta)
+                if tt_score is not None:
+                    return tt_score
+                ply = self.root_depth - depth + 1
+                moves = self.ordered_moves(c_board.get_all_possible_moves(color), tt_move, ply)
+                beta_in = beta
+                best_move = None
+                for move in moves:
+                    c_board.make_move(move, color)
+                    v = self.MaxValue(depth - 1, alpha, beta, c_board, self.oppoent[color])
+                    c_board.undo()
+                    if v < beta:
+                        beta = v
+                        best_move = move
+                    if alpha >= beta:
+                        self.cutoff(move, ply, depth)
+                        self.tt.store(key, depth, UPPER, beta, best_move)
+                        return beta
+                if moves:
+                    self.tt.store(key, depth, EXACT if beta < beta_in else LOWER, beta, best_move)
                 return beta
 
     def MaxValue(self, depth, alpha, beta, c_board, color):
+        self.nodes += 1
+        if self.deadline is not None and time.time() > self.deadline:
+            raise SearchTimeout()
         win_num = c_board.is_win(color)
         if win_num == self.color:
             return 100000000000000000
@@ -103,20 +275,31 @@ class StudentAI():
             if depth == 0:
                 return self.score(color, c_board) # - self.score(self.oppoent[color],c_board)
             else:
-                moves = c_board.get_all_possible_moves(color)
-                for index in range(len(moves)):
-                    for inner_index in range(len(moves[index])):
-##                        copy_board = copy.deepcopy(c_board)
-##                        copy_board.make_move(moves[index][inner_index], color)
-##                        alpha = max(alpha, self.MinValue(depth - 1, alpha, beta, copy_board, self.oppoent[color]))
-                        c_board.make_move(moves[index][inner_index], color)
-                        alpha = max(alpha, self.MinValue(depth - 1, alpha, beta, c_board, self.oppoent[color]))
-                        c_board.undo()
-                        if alpha >= beta:
-                            return alpha
+                key = c_board.zobrist_key
+                tt_score, tt_move = self.tt.lookup(key, depth, alpha, beta)
+                if tt_score is not None:
+                    return tt_score
+                ply = self.root_depth - depth + 1
+                moves = self.ordered_moves(c_board.get_all_possible_moves(color), tt_move, ply)
+                alpha_in = alpha
+                best_move = None
+                for move in moves:
+                    c_board.make_move(move, color)
+                    v = self.MinValue(depth - 1, alpha, beta, c_board, self.oppoent[color])
+                    c_board.undo()
+                    if v > alpha:
+                        alpha = v
+                        best_move = move
+                    if alpha >= beta:
+                        self.cutoff(move, ply, depth)
+                        self.tt.store(key, depth, LOWER, alpha, best_move)
+                        return alpha
+                if moves:
+                    self.tt.store(key, depth, EXACT if alpha > alpha_in else UPPER, alpha, best_move)
                 return alpha
 
     def score(self, color, board_status):
+        grid = board_status.board
         score = 0
         is_all_king = True
         #check if this step will be captured or not
@@ -151,7 +334,7 @@ class StudentAI():
 
             for row in range(board_status.row):
                 for col in range(board_status.col):
-                    checker = board_status.board[row][col]
+                    checker = grid[row][col]
                     checker_color = 0
                     if checker.color == "B":
                         checker_color = 1
@@ -173,7 +356,7 @@ class StudentAI():
                                 temp_farthest_distance = 0
                                 for s_row in range(board_status.row):
                                     for s_col in range(board_status.col):
-                                        s_checker = board_status.board[s_row][s_col]
+                                        s_checker = grid[s_row][s_col]
                                         if s_checker.color == o_color:
                                             if s_checker.is_king == False and s_row < row:
                                                 opp_regular_pos.append((s_row,s_col))
@@ -216,7 +399,7 @@ class StudentAI():
                                 temp_farthest_distance = 0
                                 for s_row in range(board_status.row):
                                     for s_col in range(board_status.col):
-                                        s_checker = board_status.board[s_row][s_col]
+                                        s_checker = grid[s_row][s_col]
                                         if s_checker.color == o_color:
                                             if s_checker.is_king == False and s_row < row:
                                                 opp_regular_pos.append((s_row, s_col))
@@ -257,28 +440,28 @@ class StudentAI():
                     if col == 0:## at the boarder
                         #check specific position pattern
                         if row+2 < board_status.row:
-                            if board_status.board[row+2][col].color == l_color:
-                                if board_status.board[row+1][col+1].color == l_color:
+                            if grid[row+2][col].color == l_color:
+                                if grid[row+1][col+1].color == l_color:
                                     score -= 20
                         if 0 <= row-2:
-                            if board_status.board[row-2][col].color == l_color:
-                                if board_status.board[row-1][col+1].color == l_color:
+                            if grid[row-2][col].color == l_color:
+                                if grid[row-1][col+1].color == l_color:
                                     score -= 20
                         score += 100
                     elif col == board_status.col-1: #same pattern as above with other position
                         if row+2 < board_status.row:
-                            if board_status.board[row+2][col].color == l_color:
-                                if board_status.board[row+1][col-1].color == l_color:
+                            if grid[row+2][col].color == l_color:
+                                if grid[row+1][col-1].color == l_color:
                                     score -= 20
                         if 0 <= row-2 and row+1 < board_status.col:
-                            if board_status.board[row-2][col].color == l_color:
-                                if board_status.board[row-1][col-1].color == l_color:
+                            if grid[row-2][col].color == l_color:
+                                if grid[row-1][col-1].color == l_color:
                                     score -= 20
                         score += 100
                     #if there are multiple checkers line up together
                     for i in range(1,3):
                         if row+i < board_status.row and col+i < board_status.col:
-                            if board_status.board[row+i][col+i].color == l_color:
+                            if grid[row+i][col+i].color == l_color:
                                 score += i*15
                             else:
                                 break
@@ -286,7 +469,7 @@ class StudentAI():
                             break
                     for i in range(1,3):
                         if row+i < board_status.row and 0 <= col-i:
-                            if board_status.board[row+i][col-i].color == l_color:
+                            if grid[row+i][col-i].color == l_color:
                                 score += i*15
                             else:
                                 break
@@ -295,7 +478,7 @@ class StudentAI():
 
                     for i in range(1,3):
                         if 0 <= row-i and col+i < board_status.col:
-                            if board_status.board[row-i][col+i].color == l_color:
+                            if grid[row-i][col+i].color == l_color:
                                 score += i*15
                             else:
                                 break
@@ -303,7 +486,7 @@ class StudentAI():
                             break
                     for i in range(1,3):
                         if 0 <= row -i  and 0 <= col-i:
-                            if board_status.board[row-i][col-i].color == l_color:
+                            if grid[row-i][col-i].color == l_color:
                                 score += i*15
                             else:
                                 break
@@ -312,38 +495,38 @@ class StudentAI():
                     #check if there are position that cause opponent multiple jumps
                     if row+2 < board_status.row:
                         if col+2 < board_status.col:
-                            if board_status.board[row+2][col+2].color == l_color and board_status.board[row+1][col+1].color != l_color:
+                            if grid[row+2][col+2].color == l_color and grid[row+1][col+1].color != l_color:
                                 score -= 20
-                            if board_status.board[row+2][col].color == l_color and board_status.board[row+1][col+1].color != l_color:
+                            if grid[row+2][col].color == l_color and grid[row+1][col+1].color != l_color:
                                 score -= 20
                         if 0 <= col-2 :
-                            if board_status.board[row+2][col-2].color == l_color and board_status.board[row+1][col-1].color != l_color:
+                            if grid[row+2][col-2].color == l_color and grid[row+1][col-1].color != l_color:
                                 score -= 20
-                            if board_status.board[row+2][col].color == l_color and board_status.board[row+1][col-1].color != l_color:
+                            if grid[row+2][col].color == l_color and grid[row+1][col-1].color != l_color:
                                 score -= 20
                     if 0 <= row-2:
                         if col+2 < board_status.col:
-                            if board_status.board[row-2][col+2].color == l_color and board_status.board[row-1][col+1].color != l_color:
+                            if grid[row-2][col+2].color == l_color and grid[row-1][col+1].color != l_color:
                                 score -= 20
                         if 0 <= col-2:
-                            if board_status.board[row-2][col-2].color == l_color and board_status.board[row-1][col-1].color != l_color:
+                            if grid[row-2][col-2].color == l_color and grid[row-1][col-1].color != l_color:
                                 score -= 20
                     
 
                     #check if there are triangle position
                     if 0 <= row-1 and row+1 < board_status.row:
                         if col+1 < board_status.col:
-                            if board_status.board[row-1][col+1].color == l_color and board_status.board[row+1][col+1].color == l_color:
+                            if grid[row-1][col+1].color == l_color and grid[row+1][col+1].color == l_color:
                                 score += 50
                         if 0 < col-1:
-                            if board_status.board[row-1][col-1].color == l_color and board_status.board[row+1][col-1].color == l_color:
+                            if grid[row-1][col-1].color == l_color and grid[row+1][col-1].color == l_color:
                                 score += 50
                     if 0 < col-1 and col+1 < board_status.col:
                         if 0 <= row-1:
-                            if board_status.board[row-1][col-1].color == l_color and board_status.board[row-1][col+1].color == l_color:
+                            if grid[row-1][col-1].color == l_color and grid[row-1][col+1].color == l_color:
                                 score += 50
                         if row+1 < board_status.row:
-                            if board_status.board[row+1][col-1].color == l_color and board_status.board[row+1][col+1].color == l_color:
+                            if grid[row+1][col-1].color == l_color and grid[row+1][col+1].color == l_color:
                                 score += 50
             
             if num_of_king < num_of_opp_king:
@@ -472,3 +655,40 @@ class StudentAI():
                                         temp_board[t_row + 1][t_col + 1] == color:
                                             score += 50
 '''
+
+
+if __name__ == "__main__":
+    import random
+    import sys
+
+    # the clock is used: over games against random moves, the searched moves together spend most of the time
+    # move_time gave them, and the game never takes longer than its clock
+    game_time = float(sys.argv[1]) if len(sys.argv) > 1 else 20
+    budget = spent = 0.0
+    for game in range(4):
+        random.seed(game)
+        color = 1 + game % 2
+        ai = StudentAI(7, 7, 2, game_time=game_time)
+        board = Board(7, 7, 2)
+        board.initialize_game()
+        move = Move([])
+        turn = 1
+        while True:
+            if turn == color:
+                move_start = time.time()
+                move = ai.get_move(move)
+                if ai.budget > 0:
+                    budget += ai.budget
+                    spent += time.time() - move_start
+            else:
+                move = random.choice(random.choice(board.get_all_possible_moves(turn)))
+            board.make_move(move, turn)
+            winner = board.is_win(turn)
+            if winner != 0:
+                break
+            turn = 3 - turn
+        print("game %d: winner %d, %d moves, %.1f of %.1f s used, depth %d at the end"
+              % (game, winner, ai.moves_played, ai.time_used, game_time, ai.depth_reached))
+        assert ai.time_used < game_time
+    print("searched moves spent %.1f of the %.1f s they were given (%.0f%%)" % (spent, budget, 100 * spent / budget))
+    assert spent > 0.6 * budget
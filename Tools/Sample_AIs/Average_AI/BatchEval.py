@@ -0,0 +1,239 @@
+"""
+This module has the BatchEvaluator Class which scores many positions in one NumPy call, so a searcher can
+collect the leaves of its frontier and evaluate them together instead of calling score once per leaf.
+
+It computes AverageAI.score. The piece terms (material, kings, advancement, edge men, the king distance
+terms) and the formation patterns only depend on where the pieces are. The opponent's moves, which score
+counts and checks for captures, need move generation: the caller passes them in, and leaves them out of the
+scores when it does not have them.
+
+We are following the javadoc docstring format which is:
+@param tag describes the input parameters of the function
+@return tag describes what the function returns
+@raise tag describes the errors this function can raise
+"""
+
+import numpy as np
+
+# square values of an encoded position, black is positive so a position is flipped to the other side by
+# multiplying it by -1
+EMPTY = 0
+BLACK_MAN = 1
+BLACK_KING = 2
+WHITE_MAN = -1
+WHITE_KING = -2
+
+# score of a position in which the opponent can capture, and weight of one opponent move
+CAPTURED_SCORE = -100000
+OPP_MOVE_WEIGHT = -40
+
+PAD = 2  # the patterns look two squares away, the padding keeps every look inside the array
+DIAGONALS = ((1, 1), (1, -1), (-1, 1), (-1, -1))
+
+_codes = {("B", False): BLACK_MAN, ("B", True): BLACK_KING, ("W", False): WHITE_MAN, ("W", True): WHITE_KING}
+
+
+class BatchEvaluator:
+    """
+    This class describes BatchEvaluator. The tables that only depend on the board size are built once in
+    __init__, evaluate then works on an int8 array of shape (positions, row, col).
+    """
+    def __init__(self, col, row):
+        """
+        Intializes the per-square tables of a board size
+        @param col: number of columns in the board
+        @param row: number of rows in the board
+        """
+        self.col = col
+        self.row = row
+        rows = np.arange(row)
+        # advancement of a man by row, the same numbers score adds up square by square
+        black = np.where(rows < row / 2, 50, 50 + rows * 5)
+        black[0] = 1000
+        white = np.where(rows > row / 2, 50, 50 + (row - rows) * 5)
+        white[row - 1] = 1000
+        edge = np.zeros(col)
+        edge[0] = edge[col - 1] = 20
+        # advance[color] is a (row*col,) table for the men of that color
+        self.advance = {1: (black[:, None] + edge[None, :]).ravel(), 2: (white[:, None] + edge[None, :]).ravel()}
+        r, c = np.divmod(np.arange(row * col), col)
+        # distance[k, t] is the distance between squares k and t, split by whether t is on a lower row than k
+        distance = np.sqrt((r[:, None] - r[None, :]) ** 2 + (c[:, None] - c[None, :]) ** 2)
+        behind = r[None, :] < r[:, None]
+        self.distance = distance
+        self.distance_behind = np.where(behind, distance, 0.0)
+        self.distance_ahead = np.where(behind, 0.0, distance)
+        self.ahead = (~behind).astype(np.float64)
+        self.patterns = self._patterns()
+        # every square of the edge columns scores 100 whatever is on it
+        self.edge_bonus = 100 * row * (2 if col > 1 else 1)
+
+    def _patterns(self):
+        """
+        Lists the formation patterns of score
+        @return: list of (weight, anchors, conditions): anchors is a bool (row, col) array of the squares the
+                 pattern is checked from, conditions a list of (dr, dc, own) that must all hold, own is True
+                 for a square holding our piece and False for one that does not
+        """
+        row, col = self.row, self.col
+        r, c = np.indices((row, col))
+        patterns = []
+        # men on the edge columns with an own piece two rows away and one diagonally in between
+        left = c == 0
+        right = (c == col - 1) & ~left
+        patterns.append((-20, left & (r + 2 < row), [(2, 0, True), (1, 1, True)]))
+        patterns.append((-20, left & (r - 2 >= 0), [(-2, 0, True), (-1, 1, True)]))
+        patterns.append((-20, right & (r + 2 < row), [(2, 0, True), (1, -1, True)]))
+        patterns.append((-20, right & (r - 2 >= 0) & (r + 1 < col), [(-2, 0, True), (-1, -1, True)]))
+        # own pieces lined up on a diagonal, one or two squares away
+        everywhere = np.ones((row, col), dtype=bool)
+        for dr, dc in DIAGONALS:
+            patterns.append((15, everywhere, [(dr, dc, True)]))
+            patterns.append((30, everywhere, [(dr, dc, True), (2 * dr, 2 * dc, True)]))
+        # own pieces two squares apart with a gap the opponent could jump through
+        down_right = (r + 2 < row) & (c + 2 < col)
+        down_left = (r + 2 < row) & (c - 2 >= 0)
+        patterns.append((-20, down_right, [(2, 2, True), (1, 1, False)]))
+        patterns.append((-20, down_right, [(2, 0, True), (1, 1, False)]))
+        patterns.append((-20, down_left, [(2, -2, True), (1, -1, False)]))
+        patterns.append((-20, down_left, [(2, 0, True), (1, -1, False)]))
+        patterns.append((-20, (r - 2 >= 0) & (c + 2 < col), [(-2, 2, True), (-1, 1, False)]))
+        patterns.append((-20, (r - 2 >= 0) & (c - 2 >= 0), [(-2, -2, True), (-1, -1, False)]))
+        # triangles, score checks the left ones only from the third column on
+        middle_rows = (r - 1 >= 0) & (r + 1 < row)
+        middle_cols = (c - 1 > 0) & (c + 1 < col)
+        patterns.append((50, middle_rows & (c + 1 < col), [(-1, 1, True), (1, 1, True)]))
+        patterns.append((50, middle_rows & (c - 1 > 0), [(-1, -1, True), (1, -1, True)]))
+        patterns.append((50, middle_cols & (r - 1 >= 0), [(-1, -1, True), (-1, 1, True)]))
+        patterns.append((50, middle_cols & (r + 1 < row), [(1, -1, True), (1, 1, True)]))
+        return patterns
+
+    def encode(self, board):
+        """
+        Encodes one board
+        @param board: Board or BitBoard
+        @return: int8 array of shape (row, col)
+        """
+        return np.array([[_codes.get((checker.color, checker.is_king), EMPTY) for checker in board_row]
+                         for board_row in board.board], dtype=np.int8)
+
+    def encode_batch(self, boards):
+        """
+        Encodes a list of boards
+        @param boards: list of Board or BitBoard of this size
+        @return: int8 array of shape (len(boards), row, col)
+        """
+        return np.stack([self.encode(board) for board in boards])
+
+    def evaluate(self, positions, color, opp_moves=None, opp_captures=None):
+        """
+        Scores a batch of positions for one player
+        @param positions: int8 array of shape (positions, row, col), or (row, col) for a single position
+        @param color: player the scores are for, 1 for black and 2 for white
+        @param opp_moves: number of moves the opponent has in every position, left out of the scores if None
+        @param opp_captures: bool per position, True where the opponent can capture, which score rates
+                             CAPTURED_SCORE whatever else is on the board, ignored if None
+        @return: float array of shape (positions,), higher is better for color, equal to AverageAI.score
+                 when opp_moves and opp_captures are given
+        """
+        positions = np.asarray(positions, dtype=np.int8).reshape(-1, self.row * self.col)
+        if color == 2:
+            positions = -positions
+        men = (positions == BLACK_MAN).astype(np.float64)
+        kings = (positions == BLACK_KING).astype(np.float64)
+        opp_men = (positions == WHITE_MAN).astype(np.float64)
+        opp_kings = (positions == WHITE_KING).astype(np.float64)
+        num_men = men.sum(axis=1)
+        num_kings = kings.sum(axis=1)
+        material = num_men + num_kings - opp_men.sum(axis=1) - opp_kings.sum(axis=1)
+
+        score = 5000 * num_kings + men @ self.advance[color]
+        score += np.where(num_men == 0, 10000, 0)
+        score += self.edge_bonus + self.pattern_scores(positions > 0)
+
+        # for every king: distances to the opponent men behind it, and to the other opponent pieces
+        sum_regular = ((kings @ self.distance_behind) * opp_men).sum(axis=1)
+        sum_king = ((kings @ self.distance_ahead) * opp_men + (kings @ self.distance) * opp_kings).sum(axis=1)
+        # score counts the opponent kings and the opponent men not behind it once for every king
+        num_opp_kings = ((kings @ self.ahead) * opp_men).sum(axis=1) + num_kings * opp_kings.sum(axis=1)
+        # per king, the farthest opponent man behind it, or else the first of the other opponent pieces in
+        # board order, only the (position, king) pairs are expanded
+        position, square = np.nonzero(kings)
+        regular = self.distance_behind[square] * opp_men[position]
+        others = self.ahead[square] * opp_men[position] + opp_kings[position]
+        first = np.argmax(others > 0, axis=1)
+        first_other = np.where(others.any(axis=1), self.distance[square, first], 0.0)
+        farthest_regular = regular.max(axis=1, initial=0.0)
+        per_king = np.where(farthest_regular > 0, farthest_regular, first_other)
+        farthest = np.bincount(position, weights=per_king, minlength=len(positions))
+
+        # with fewer kings than the opponent the kings should keep away, otherwise close in
+        fewer = num_kings < num_opp_kings
+        sum_king = np.where(fewer, -sum_king, sum_king)
+        farthest = np.where(fewer, -farthest, farthest)
+        score += np.where(fewer, 0, 10 * self.row * self.col)
+        score = score - 30 * sum_regular - 50 * farthest - 70 * sum_king + 100 * material
+        if opp_moves is not None:
+            score = score + OPP_MOVE_WEIGHT * np.asarray(opp_moves)
+        if opp_captures is not None:
+            score = np.where(opp_captures, CAPTURED_SCORE, score)
+        return score
+
+    def pattern_scores(self, own):
+        """
+        Adds up the formation patterns
+        @param own: bool array of shape (positions, row * col), True on the squares of the player scored
+        @return: float array of shape (positions,)
+        """
+        grid = np.zeros((len(own), self.row + 2 * PAD, self.col + 2 * PAD), dtype=bool)
+        grid[:, PAD:PAD + self.row, PAD:PAD + self.col] = own.reshape(-1, self.row, self.col)
+        total = np.zeros(len(own))
+        for weight, anchors, conditions in self.patterns:
+            found = np.broadcast_to(anchors, (len(own), self.row, self.col))
+            for dr, dc, is_own in conditions:
+                square = grid[:, PAD + dr:PAD + dr + self.row, PAD + dc:PAD + dc + self.col]
+                found = found & (square if is_own else ~square)
+            total += weight * found.sum(axis=(1, 2))
+        return total
+
+
+if __name__ == "__main__":
+    import random
+    import time
+    from BoardClasses import Board
+    from AverageAI import StudentAI
+
+    # parity with AverageAI.score on positions from seeded random games, then the time of both
+    for col, row, p in ((7, 7, 2), (8, 8, 3), (10, 10, 3)):
+        rng = random.Random(col)
+        boards = []
+        while len(boards) < 1000:
+            board = Board(col, row, p)
+            board.initialize_game()
+            turn = 1
+            for _ in range(rng.randint(0, 120)):
+                moves = board.get_all_possible_moves(turn)
+                if not moves:
+                    break
+                board.make_move(rng.choice(rng.choice(moves)), turn)
+                turn = 3 - turn
+            boards.append(board)
+        evaluator = BatchEvaluator(col, row)
+        ai = StudentAI(col, row, p)
+        positions = evaluator.encode_batch(boards)
+        for color in (1, 2):
+            opp_moves = [[move for checker_moves in board.get_all_possible_moves(3 - color) for move in checker_moves]
+                         for board in boards]
+            counts = np.array([len(moves) for moves in opp_moves])
+            captures = np.array([any(abs(move[0][0] - move[1][0]) > 1 for move in moves) for moves in opp_moves])
+            start = time.perf_counter()
+            batch = evaluator.evaluate(positions, color, counts, captures)
+            evaluated = time.perf_counter()
+            scalar = np.array([ai.score(color, board) for board in boards])
+            scored = time.perf_counter()
+            mismatches = np.nonzero(~np.isclose(batch, scalar, rtol=1e-9, atol=1e-6))[0]
+            print("%dx%d color %d: %d of %d positions differ from score, evaluate %.1f us, score %.1f us per position"
+                  % (col, row, color, len(mismatches), len(boards), (evaluated - start) / len(boards) * 1e6,
+                     (scored - evaluated) / len(boards) * 1e6))
+            for i in mismatches[:3]:
+                print("  position %d: evaluate %r, score %r" % (i, batch[i], scalar[i]))
@@ -8,8 +8,6 @@ We are following the javadoc docstring format which is:
 """
 
 
-import copy
-import re
 from Move import Move
 class InvalidMoveError(Exception):
     pass
@@ -18,6 +16,8 @@ class InvalidParameterError(Exception):
     pass
 
 import Checker
+from Zobrist import get_table
+from MoveCache import MoveCache
 
 class Board:
     """
@@ -53,6 +53,10 @@ class Board:
 
         self.black_count = 0
         self.white_count = 0
+        self.zobrist_table = get_table(self.col, self.row)
+        self.zobrist_key = 0 # xor of the zobrist numbers of every piece, updated by make_move and undo
+        self.move_cache = MoveCache()
+        self.step_table = Checker.get_step_table(self.col, self.row)
 
 
     def initialize_game(self):
@@ -87,18 +91,18 @@ class Board:
                     self.board[i][j] = Checker.Checker("B", [i,j])
                 self.white_count += 1
                 self.black_count += 1
-
+        self.zobrist_key = self.zobrist_table.key_of(self)
 
 
     def make_move(self, move, turn):
         """
-        Makes Move on the board
+        Makes Move on the board. The squares are updated in place and one tuple is pushed on saved_move:
+        (start, final position, became king, captured pieces, previous tie counter, previous zobrist key)
         @param move: Move object provided by the StudentAI, Uses this parameter to make the move on the board
         @param turn: this parameter tracks the current turn. either player 1 (black) or player 2 (white)
         @return:
         @raise InvalidMoveError: raises this objection if the move provided isn't valid on the current board
         """
-        temp_saved_move = [Move([]),[],False]
         if type(turn) is int:
             if turn == 1:
                 turn = 'B'
@@ -107,75 +111,73 @@ class Board:
             else:
                 raise InvalidMoveError
         move_list = move.seq
-        move_to_check = []
         ultimate_start = move_list[0]
-        ultimate_end = move_list[-1]
         is_start_checker_king = self.board[ultimate_start[0]][ultimate_start[1]].is_king
-        past_positions = [ultimate_start]
-        capture_positions = []
-        for i in range(len(move_list)-1):
-            move_to_check.append((move_list[i],move_list[i + 1]))
-        # e.g move = Move((0,0)-(2,2)-(0,4))
-        #     move_to_check = [((0,0),(2,2)),((2,2),(0,4))]
+        became_king = False
         if_capture = False
+        saved_tie_counter = self.tie_counter
         self.tie_counter += 1
         saved_enemy_position = []
-        for t in range(len(move_to_check)):
-            start = move_to_check[t][0] # e.g. (0,0)
-            target= move_to_check[t][1] # e.g. (2,2)
+        start = ultimate_start
+        for t in range(1, len(move_list)):
+            # e.g move = Move((0,0)-(2,2)-(0,4)) is checked as (0,0)->(2,2) and then (2,2)->(0,4)
+            target = move_list[t]
             if self.is_valid_move(start[0],start[1],target[0],target[1],turn) or (if_capture and abs(start[0]-target[0]) == 1):
                 # invailid move or attempting to make a single move after capture
-                self.board[start[0]][start[1]].color = "."
-                self.board[target[0]][target[1]].color = turn
-                self.board[target[0]][target[1]].is_king = self.board[start[0]][start[1]].is_king
-                self.board[start[0]][start[1]].become_man()
-                past_positions.append(target)
+                start_checker = self.board[start[0]][start[1]]
+                target_checker = self.board[target[0]][target[1]]
+                start_checker.color = "."
+                target_checker.color = turn
+                target_checker.is_king = start_checker.is_king
+                start_checker.become_man()
                 if abs(start[0]-target[0]) == 2:
                     # capture happened
                     if_capture = True
                     self.tie_counter = 0
-                    capture_position = ((start[0] + (target[0]-start[0])//2), (start[1] + (target[1]-start[1])//2))
-                    # calculate capture position
-                    capture_positions.append(capture_position)
+                    captured = self.board[(start[0] + target[0]) // 2][(start[1] + target[1]) // 2]
                     # record capture position
-                    saved_enemy_position.append((capture_position[0],capture_position[1],self.board[capture_position[0]][capture_position[1]].color,self.board[capture_position[0]][capture_position[1]].is_king))
-                    self.board[capture_position[0]][capture_position[1]] = Checker.Checker(".", [capture_position[0], capture_position[1]])
+                    saved_enemy_position.append((captured.row, captured.col, captured.color, captured.is_king))
+                    captured.color = "."
+                    captured.become_man()
                     # capture
                     if turn == "B":
                         self.white_count -= 1
                     else:
                         self.black_count -= 1
-                if (turn == 'B' and target[0] == self.row - 1):# and not self.board[target[0]][target[1]].is_king):
-                    if not is_start_checker_king:
-                        temp_saved_move[2] = True
-                    self.board[target[0]][target[1]].become_king()
-                    #self.saved_move[2] = True
-                    if not is_start_checker_king:
-                        break
-
-                elif (turn == 'W' and target[0] == 0):# and not self.board[target[0]][target[1]].is_king):
-                    if not is_start_checker_king:
-                        temp_saved_move[2] = True
-                    self.board[target[0]][target[1]].become_king()
-                     #self.saved_move[2] = True
+                start = target
+                if (turn == 'B' and target[0] == self.row - 1) or (turn == 'W' and target[0] == 0):
+                    target_checker.become_king()
                     if not is_start_checker_king:
+                        # a man that reaches the last row becomes king and its move ends there
+                        became_king = True
                         break
-                else:
-                    temp_saved_move[2] = False #self.saved_move[2] = False
-
             else:
-                for failed_capture in capture_positions:
-                    # recover failed captures
-                    self.board[failed_capture[0]][failed_capture[1]] = Checker.Checker(self.opponent[turn],[failed_capture[0],failed_capture[1]])
-                for failed_position in past_positions:
-                    # recover failed moves
-                    self.board[failed_position[0]][failed_position[1]] = Checker.Checker(".", [failed_position[0],failed_position[1]])
-                self.board[ultimate_start[0]][ultimate_start[1]] = Checker.Checker(turn, [ultimate_start[0],ultimate_start[1]])
+                # put the moving checker back and recover failed captures
+                moving_checker = self.board[start[0]][start[1]]
+                moving_checker.color = "."
+                moving_checker.become_man()
+                start_checker = self.board[ultimate_start[0]][ultimate_start[1]]
+                start_checker.color = turn
+                start_checker.is_king = is_start_checker_king
+                for x, y, c, k in saved_enemy_position:
+                    self.board[x][y].color = c
+                    self.board[x][y].is_king = k
+                    if c == "W":
+                        self.white_count += 1
+                    else:
+                        self.black_count += 1
+                self.tie_counter = saved_tie_counter
                 raise InvalidMoveError
 
-        temp_saved_move[0] = copy.deepcopy(move) #self.saved_move[0] = copy.deepcopy(move)
-        temp_saved_move[1] = saved_enemy_position #self.saved_move[1] = saved_enemy_position
-        self.saved_move.append(temp_saved_move)
+        self.saved_move.append((ultimate_start, start, became_king, saved_enemy_position, saved_tie_counter, self.zobrist_key))
+        # only the start square, the final square and the captured pieces change
+        table = self.zobrist_table
+        self.zobrist_key ^= table.side
+        self.zobrist_key ^= table.piece(turn, is_start_checker_king, ultimate_start[0], ultimate_start[1])
+        self.zobrist_key ^= table.piece(turn, self.board[start[0]][start[1]].is_king, start[0], start[1])
+        for x, y, c, k in saved_enemy_position:
+            self.zobrist_key ^= table.piece(c, k, x, y)
+
     def is_in_board(self,pos_x,pos_y):
         """
         Checks if the coordinate provided is in board. Is an internal function
@@ -235,17 +237,33 @@ class Board:
 
     def get_all_possible_moves(self,color):
         """
-        this function returns the all possible moves of the player whose turn it is
+        this function returns the all possible moves of the player whose turn it is.
+        The result is cached by position, the same list is returned again until the position changes
+        so it must not be modified.
         @param color: color of the player whose turn it is
         @return result: a list of Move objects which describe possible moves
         @raise :
         """
-        result = []
         if type(color) is int:
             if color == 1:
                 color = 'B'
             elif color == 2:
                 color = 'W'
+        key = (self.zobrist_key, color)
+        result = self.move_cache.get(key)
+        if result is None:
+            result = self._generate_all_possible_moves(color)
+            self.move_cache.put(key, result)
+        return result
+
+    def _generate_all_possible_moves(self,color):
+        """
+        Generates the moves of get_all_possible_moves by asking every checker of this color. Is an internal function
+        @param color: 'B' or 'W'
+        @return result: a list of Move objects which describe possible moves
+        @raise :
+        """
+        result = []
         is_capture = False
         temp = 0
         for row in range(self.row):
@@ -273,12 +291,45 @@ class Board:
 
         return result
 
+    def has_any_move(self,color):
+        """
+        Checks if the player has at least one legal move. Stops at the first simple move or capture found
+        instead of generating every move, and answers from the move cache when the position is in it.
+        @param color: color of the player to check
+        @return: a bool which is True if the player can move
+        @raise :
+        """
+        if type(color) is int:
+            if color == 1:
+                color = 'B'
+            elif color == 2:
+                color = 'W'
+        if (self.black_count if color == 'B' else self.white_count) == 0:
+            return False
+        cached = self.move_cache.entries.get((self.zobrist_key, color))
+        if cached is not None:
+            return len(cached) > 0
+        opponent = self.opponent[color]
+        steps = self.step_table.steps[color]
+        for row in range(self.row):
+            for col in range(self.col):
+                checker = self.board[row][col]
+                if checker.color != color:
+                    continue
+                for x, y, jump_x, jump_y in steps[checker.is_king][row][col]:
+                    target_color = self.board[x][y].color
+                    if target_color == ".":
+                        return True
+                    if target_color == opponent and jump_x is not None and self.board[jump_x][jump_y].color == ".":
+                        return True
+        return False
+
     def is_win(self,turn):
         """
-        this function tracks if any player has won
-        @param :
-        @param :
-        @return :
+        this function tracks if any player has won. Uses has_any_move and the piece counters, so no move
+        list is generated and the board is not scanned for pieces.
+        @param turn: the player who just moved
+        @return : 0 if the game goes on, -1 for a tie, otherwise the number of the winning player
         @raise :
         """
         if turn == "W":
@@ -289,10 +340,10 @@ class Board:
             return -1
         W_has_move = True
         B_has_move = True
-        if len(self.get_all_possible_moves(1)) == 0:
+        if not self.has_any_move(1):
             if turn != 1:
                 B_has_move = False
-        elif len(self.get_all_possible_moves(2)) == 0:
+        elif not self.has_any_move(2):
             if turn != 2:
                 W_has_move = False
 
@@ -301,18 +352,10 @@ class Board:
         elif not W_has_move and B_has_move:
             return 1
 
-        W = True
-        B = True
-
-        for row in range(self.row):
-            for col in range(self.col):
-                checker = self.board[row][col]
-                if checker.color == 'W':
-                    W = False
-                elif checker.color == 'B':
-                    B = False
-                if not W and not B:
-                    return 0
+        W = self.white_count == 0
+        B = self.black_count == 0
+        if not W and not B:
+            return 0
         if W:
             return 2
         elif B:
@@ -381,38 +424,50 @@ class Board:
             raise InvalidParameterError("N*P is odd -- must be even")
 
     def undo(self):
-        if self.saved_move != []:
-            temp_saved_move = self.saved_move[-1]
-            original_point = temp_saved_move[0][0]
-            target_point = temp_saved_move[0][-1]
-
-            
- #           original_point = self.saved_move[0][0]
- #           target_point = self.saved_move[0][-1]
-            self.board[original_point[0]][original_point[1]].color = self.board[target_point[0]][target_point[1]].color
-            if temp_saved_move[2]: #self.saved_move[2]: #if became king in that move, cancel that
-                self.board[original_point[0]][original_point[1]].is_king = False
-            else:
-                self.board[original_point[0]][original_point[1]].is_king = self.board[target_point[0]][target_point[1]].is_king
-            if target_point != original_point:
-                self.board[target_point[0]][target_point[1]].color = "."
-                self.board[target_point[0]][target_point[1]].is_king = False
-            for saved_enemy in temp_saved_move[1]:#self.saved_move[1]:
-                x,y,c,k = saved_enemy
-                self.board[x][y].color = c
-                self.board[x][y].is_king = k
-            self.tie_counter -= 1
-            self.saved_move.pop(-1)
-        else:
+        """
+        Takes back the last move made with make_move. Only the squares the move touched are restored and
+        the piece counters are updated from the captured pieces, nothing is rescanned.
+        @param :
+        @return :
+        @raise Exception: if there is no move to undo
+        """
+        if not self.saved_move:
             raise Exception("Cannot undo operation")
-        self.black_count = 0
-        self.white_count = 0
-        for i in range(self.row):
-            for j in range(self.col):
-                if self.board[i][j].color=="W":
-                    self.white_count += 1
-                elif self.board[i][j].color == "B":
-                    self.black_count += 1
+        original_point, target_point, became_king, saved_enemy_position, tie_counter, zobrist_key = self.saved_move.pop()
+        target_checker = self.board[target_point[0]][target_point[1]]
+        color = target_checker.color
+        is_king = target_checker.is_king and not became_king # if became king in that move, cancel that
+        target_checker.color = "."
+        target_checker.is_king = False
+        original_checker = self.board[original_point[0]][original_point[1]]
+        original_checker.color = color
+        original_checker.is_king = is_king
+        for x, y, c, k in saved_enemy_position:
+            self.board[x][y].color = c
+            self.board[x][y].is_king = k
+            if c == "W":
+                self.white_count += 1
+            else:
+                self.black_count += 1
+        self.tie_counter = tie_counter
+        self.zobrist_key = zobrist_key
+
+    def snapshot(self):
+        """
+        Marks the current position so it can be returned to with restore, without copying the board
+        @param :
+        @return ply: number of moves on saved_move
+        """
+        return len(self.saved_move)
+
+    def restore(self, ply):
+        """
+        Takes back every move made after snapshot returned ply. The cost is one undo per move taken back.
+        @param ply: value returned by snapshot
+        @return :
+        """
+        while len(self.saved_move) > ply:
+            self.undo()
 
 
 
@@ -7,10 +7,30 @@ We are following the javadoc docstring format which is:
 @raise tag describes the errors this function can raise
 """
 
+import re
+
+# a move as TournamentInterface, IOAI and NetworkAI exchange it, spaces are only allowed inside the brackets.
+# A move has at least two squares, a single square would be a pass that make_move plays as a no-op.
+_square = r"\( *([0-9]+) *, *([0-9]+) *\)"
+_move_format = re.compile(_square + "(?:-" + _square + ")+")
+_square_format = re.compile(_square)
+
+# layout of the integer code of a move, see Move.encode
+COORD_BITS = 5  # bits of the start row and of the start col
+JUMP_BIT = 2 * COORD_BITS  # set if the move is a capture
+HOPS_SHIFT = JUMP_BIT + 1  # number of hops, 0 only for the empty move
+HOPS_BITS = 5
+PATH_SHIFT = HOPS_SHIFT + HOPS_BITS  # 2 bits per hop: row goes up, col goes up
+COORD_MASK = (1 << COORD_BITS) - 1
+HOPS_MASK = (1 << HOPS_BITS) - 1
+
 class Move:
     """
-    This class is used to describe the moves being made on the board.
+    This class is used to describe the moves being made on the board. A Move never changes after it is made,
+    so it can be shared by move lists and search trees, hashed and used as a dict key.
     """
+    __slots__ = ("seq", "_str", "_code")
+
     def __init__(self,l):
         """
         Initializes Move Object
@@ -25,33 +45,103 @@ class Move:
             ________
             O |  |
 
-        In the example above, l should be [(0,0),(2,2),(0,4)]
+        In the example above, l should be [(0,0),(2,2),(0,4)]. The sequence is stored as a tuple of tuples,
+        positions given as lists are converted, so equal moves compare and hash equal.
         """
-        self.seq = list(l)
+        seq = tuple(l)
+        for position in seq:
+            if type(position) is not tuple:
+                seq = tuple(tuple(position) for position in seq)
+                break
+        object.__setattr__(self, "seq", seq)
+        object.__setattr__(self, "_str", None)
+        object.__setattr__(self, "_code", None)
 
     @classmethod
     def from_str(cls,s:str):
         """
-        This class enables the move object to be made from a str
+        This class enables the move object to be made from a str. The string is checked against the format
+        and never evaluated, since it comes from another process or over the network.
         @param s: string that describes the class. Eg '(0,0)-(2,2)-(0,4)'
+        @raise ValueError: if s is not '-1' or two or more positions in the '(row,col)' format joined by '-'
         """
+        s = s.strip()
         if (s == '-1'):
             return cls([])
-        else:
-            sequencelist = list(map(lambda x:eval(x),s.split('-')))
-            return cls(sequencelist)
+        if _move_format.fullmatch(s) is None:
+            raise ValueError("Invalid move string: %r" % s)
+        return cls([(int(row), int(col)) for row, col in _square_format.findall(s)])
+
+    def encode(self):
+        """
+        Packs the move into an int: the start square, whether it is a capture, the number of hops and the
+        diagonal direction of every hop. Equal moves get equal codes on any board size up to 32x32, different
+        moves get different codes, and the empty move is 0. The code is computed once and kept.
+        @return code: int
+        @raise ValueError: if the move has no code: no hop, a hop that is not one diagonal step, or a jump of
+                           two in a capture, a step followed by more hops, or a square outside of 32x32
+        """
+        code = self._code
+        if code is None:
+            seq = self.seq
+            code = 0
+            if seq:
+                row, col = seq[0]
+                if not (0 <= row <= COORD_MASK and 0 <= col <= COORD_MASK) or not 1 <= len(seq) - 1 <= HOPS_MASK:
+                    raise ValueError("Move %s cannot be encoded" % self)
+                code = row | col << COORD_BITS | (len(seq) - 1) << HOPS_SHIFT
+                step = abs(seq[1][0] - row)
+                if step == 2:
+                    code |= 1 << JUMP_BIT
+                elif step != 1 or len(seq) > 2:
+                    raise ValueError("Move %s cannot be encoded" % self)
+                shift = PATH_SHIFT
+                for next_row, next_col in seq[1:]:
+                    # only the direction of a hop is packed, so its length has to be the one of the move
+                    if abs(next_row - row) != step or abs(next_col - col) != step:
+                        raise ValueError("Move %s cannot be encoded" % self)
+                    code |= ((next_row > row) | (next_col > col) << 1) << shift
+                    row, col = next_row, next_col
+                    shift += 2
+            object.__setattr__(self, "_code", code)
+        return code
+
+    @classmethod
+    def decode(cls, code):
+        """
+        Rebuilds a move from the int returned by encode
+        @param code: int from encode
+        @return: Move
+        """
+        hops = code >> HOPS_SHIFT & HOPS_MASK
+        if hops == 0:
+            return cls([])
+        row = code & COORD_MASK
+        col = code >> COORD_BITS & COORD_MASK
+        step = 2 if code >> JUMP_BIT & 1 else 1
+        seq = [(row, col)]
+        path = code >> PATH_SHIFT
+        for _ in range(hops):
+            row += step if path & 1 else -step
+            col += step if path & 2 else -step
+            seq.append((row, col))
+            path >>= 2
+        move = cls(seq)
+        object.__setattr__(move, "_code", code)
+        return move
 
     """
     :return self.seq = [(0,0),(2,2),(0,4)] -> '(0,0)-(2,2)-(0,4)'
     """
     def __str__(self):
-        result = ''
-        if len(self.seq) == 0:
-            return '-1'
-        for e in self.seq:
-            result += str(e)
-            result += '-'
-        return result[:-1].replace(" ","")
+        result = self._str
+        if result is None:
+            if len(self.seq) == 0:
+                result = '-1'
+            else:
+                result = '-'.join('(%d,%d)' % (x, y) for x, y in self.seq)
+            object.__setattr__(self, "_str", result)
+        return result
 
     def __len__(self):
         return len(self.seq)
@@ -62,5 +152,76 @@ class Move:
     def __getitem__(self,i):
         return self.seq[i]
 
-    def __setitem__(self, index, value):
-        self.seq[index] = value
+    def __eq__(self, other):
+        return isinstance(other, Move) and self.seq == other.seq
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.seq)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Move is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("Move is immutable")
+
+    def __reduce__(self):
+        # pickle and copy rebuild the move from its sequence, since __setattr__ refuses to restore the slots
+        return (Move, (self.seq,))
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+
+if __name__ == "__main__":
+    import random
+    import time
+
+    # round trip of random moves through str and from_str, and mangled strings that must be refused
+    rng = random.Random(0)
+    strings = []
+    for _ in range(20000):
+        move = Move([(rng.randrange(32), rng.randrange(32)) for _ in range(rng.randint(2, 8))])
+        text = str(move)
+        assert Move.from_str(text) == move and str(Move.from_str(text)) == text, text
+        assert Move.from_str(text.replace(",", ", ")) == move, text
+        strings.append(text)
+        chars = list(text)
+        i = rng.randrange(len(chars))
+        mangled = rng.choice([
+            text[:i] + text[i + 1:],
+            text[:i] + rng.choice("()-,x9 .+_e\n") + text[i:],
+            text + "-",
+            "-" + text,
+            text.replace("(", "[").replace(")", "]"),
+            text + ";__import__('os')",
+        ])
+        try:
+            parsed = Move.from_str(mangled)
+        except ValueError:
+            continue
+        # whatever is accepted has to be a move that prints back to the same positions
+        assert Move.from_str(str(parsed)) == parsed, mangled
+    assert str(Move.from_str("-1")) == "-1" and len(Move.from_str(" -1 ")) == 0
+    for text in ("(1,1)", " (1,1) ", "(1,1)-"):
+        try:
+            Move.from_str(text)
+        except ValueError:
+            continue
+        raise AssertionError("a single square was parsed as a move: %r" % text)
+
+    start = time.perf_counter()
+    for text in strings:
+        Move.from_str(text)
+    parse_time = time.perf_counter() - start
+    start = time.perf_counter()
+    for text in strings:
+        Move(list(map(lambda x: eval(x), text.split('-'))))
+    eval_time = time.perf_counter() - start
+    print("round trip ok on %d moves, from_str %.1f us, eval %.1f us per move"
+          % (len(strings), parse_time / len(strings) * 1e6, eval_time / len(strings) * 1e6))
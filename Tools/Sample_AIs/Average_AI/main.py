@@ -10,12 +10,13 @@ We are following the javadoc docstring format which is:
 from GameLogic import GameLogic
 import sys
 sys.path.append("./")
-from socket import *
 def network_init():
     """
     This function sets up a network connection to the ICS servers incase you want to play against another AI connected to the network.
     @return response, mode: a tuple that returns the response from the ICS servers, and sends a string with either host or client to indicate whether this AI is hosting the game session or joining a session.
     """
+    # imported here, only the network mode needs sockets
+    from socket import socket, AF_INET, SOCK_STREAM, SOL_SOCKET, SO_REUSEADDR
     while True:
         serverPort = 12002
         clientSocket = socket(AF_INET, SOCK_STREAM)
@@ -68,6 +69,7 @@ if __name__ == "__main__":
     # To run under manual mode, please use this command "python3 main.py {row} {col} {k} m {order}"
     # e.g. "python3 main.py 7 7 2 m 0"
     # e.g. "python3 main.py 7 7 2 l {AI_path 1} {AI_path 2}"
+    # e.g. "python3 main.py 7 7 2 i {AI_path 1} {AI_path 2}" for Python AIs, played inside this process
     # e.g. "python3 main.py 7 7 2 n {AI_path}"
 
     # Because the initialization of network mode is different from the normal modes,
@@ -122,3 +124,7 @@ if __name__ == "__main__":
     elif mode == 'l':
         ai_path_1,ai_path_2 =  sys.argv[5],sys.argv[6]
         main.Run(mode=mode,ai_path_1=ai_path_1,ai_path_2=ai_path_2,time=1200)
+
+    elif mode == 'i' or mode == 'inprocess':
+        ai_path_1,ai_path_2 =  sys.argv[5],sys.argv[6]
+        main.Run(mode=mode,ai_path_1=ai_path_1,ai_path_2=ai_path_2,time=1200)
@@ -0,0 +1,107 @@
+"""
+This module builds the opening books StudentAI looks its first moves up in, by searching the positions of
+the first moves of a game ahead of time with a much bigger budget than a move gets in a game.
+
+For every configuration and for both colors, it walks the game from the initial position for --plies plies.
+In the positions where the AI is to move, StudentAI's search is run for --time seconds (or --iterations
+playouts) and only its move is followed. In the positions where the opponent is to move, every reply is
+followed. Forced moves are not stored, StudentAI plays them without searching anyway. The book of each
+configuration is written to src/checkers-python/books (or --out), where StudentAI opens it.
+
+e.g. "python3 build_book.py 7,7,2 8,8,3 --plies 4 --time 30"
+
+We are following the javadoc docstring format which is:
+@param tag describes the input parameters of the function
+@return tag describes what the function returns
+@raise tag describes the errors this function can raise
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "checkers-python"))
+
+import StudentAI as student
+from OpeningBook import book_path, write_book
+
+
+def walk(ai, turn, color, plies, entries):
+    """
+    Searches the positions of the AI under the current position of ai.board, depth first
+    @param ai: StudentAI whose board is the current position, it is taken back to it before returning
+    @param turn: player to move, 1 or 2
+    @param color: player the book is built for, 1 or 2
+    @param plies: plies left to walk
+    @param entries: dict zobrist key -> Move, the searched positions are added to it
+    """
+    if plies == 0:
+        return
+    board = ai.board
+    moves = board.get_all_possible_moves(turn)
+    if not moves:
+        return
+    if turn == color:
+        key = student.hash_board(board)
+        if student.has_only_one_item(moves):
+            followed = [moves[0][0]]
+        else:
+            if key not in entries:
+                ai.color = turn
+                ai.root = student.MCTSNode(color=ai.opponent[turn])
+                start = time.time()
+                entries[key] = ai.search(moves)
+                print("  %d positions, %s after %d playouts in %.1fs"
+                      % (len(entries), entries[key], ai.simulations, time.time() - start))
+            followed = [entries[key]]
+    else:
+        followed = [move for checker_moves in moves for move in checker_moves]
+    for move in followed:
+        board.make_move(move, turn)
+        if board.is_win(turn) == 0:
+            walk(ai, 3 - turn, color, plies - 1, entries)
+        board.undo()
+
+
+def build(col, row, p, plies, iterations):
+    """
+    Searches the book positions of one configuration
+    @param col: number of columns in the board
+    @param row: number of rows in the board
+    @param p: number of rows filled with pieces at the start
+    @param plies: plies of the game walked from the initial position
+    @param iterations: playouts per position at most
+    @return entries: dict zobrist key -> Move
+    """
+    ai = student.StudentAI(col, row, p)
+    ai.book = None
+    ai.iterations = iterations
+    entries = {}
+    for color in (1, 2):
+        walk(ai, 1, color, plies, entries)
+    return entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Builds the opening books of StudentAI.")
+    parser.add_argument("configs", nargs="+", help="configurations as col,row,p, e.g. 7,7,2")
+    parser.add_argument("--plies", type=int, default=4, help="plies of the game the book covers")
+    parser.add_argument("--time", type=float, default=30, help="seconds of search per position")
+    parser.add_argument("--iterations", type=int, default=1000000, help="playouts per position at most")
+    parser.add_argument("--out", default=student.BOOK_DIR, help="directory the books are written to")
+    args = parser.parse_args()
+    student.MOVE_TIME = args.time
+    os.makedirs(args.out, exist_ok=True)
+
+    for config in args.configs:
+        col, row, p = map(int, config.split(","))
+        print("%dx%d p=%d:" % (col, row, p))
+        start = time.time()
+        entries = build(col, row, p, args.plies, args.iterations)
+        path = book_path(args.out, col, row, p)
+        write_book(path, col, row, p, entries)
+        print("%d positions written to %s in %.0fs" % (len(entries), path, time.time() - start))
+
+
+if __name__ == "__main__":
+    main()
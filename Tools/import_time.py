@@ -0,0 +1,116 @@
+"""
+This module measures the startup of an AI's tournament mode, which every game of a match pays again, so a
+change that makes it import more than it needs shows up.
+
+It runs "main.py {col} {row} {p} t" with "python3 -X importtime" and an empty stdin, so the AI imports its
+modules, creates its StudentAI and exits at the end of its input. The import times the interpreter writes to
+stderr are parsed, and the fastest of --runs runs is kept for every module, since a single run is noisy.
+The imports of a bare interpreter ("python3 -c pass") are measured the same way and reported apart.
+
+It exits with 1 if the AI imports one of the --forbid modules or its own imports take longer than --max-ms.
+
+e.g. "python3 import_time.py 7 7 2 ../src/checkers-python/main.py --runs 5"
+
+We are following the javadoc docstring format which is:
+@param tag describes the input parameters of the function
+@return tag describes what the function returns
+@raise tag describes the errors this function can raise
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+# modules tournament mode has no use for, only the network, local and manual modes do
+FORBIDDEN = "socket,threading,multiprocessing,subprocess,AI_Extensions,ManualAI"
+
+
+def parse_importtime(text):
+    """
+    Parses the output of -X importtime
+    @param text: stderr of the process
+    @return imports: list of (module, self_us, cumulative_us, depth) in the order they were printed, depth 0 is
+                     a module imported by the script itself or by the interpreter startup
+    """
+    imports = []
+    for line in text.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # the header line
+        name = fields[2].rstrip()
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        imports.append((name.strip(), int(fields[0]), int(fields[1]), depth))
+    return imports
+
+
+def measure(command, cwd, runs):
+    """
+    Runs a command with -X importtime several times
+    @param command: arguments after "python3 -X importtime"
+    @param cwd: directory to run in
+    @param runs: number of runs
+    @return times, wall: dict module -> (self_us, cumulative_us, depth), each the fastest run, and the fastest
+                         wall time of the whole process in seconds
+    @raise RuntimeError: if the process exits with an error
+    """
+    times = {}
+    wall = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        process = subprocess.run([sys.executable, "-X", "importtime"] + command, cwd=cwd, stdin=subprocess.DEVNULL,
+                                 stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        wall = min(wall, time.perf_counter() - start)
+        text = process.stderr.decode(errors="replace")
+        if process.returncode != 0:
+            lines = [line for line in text.splitlines() if not line.startswith("import time:")]
+            raise RuntimeError("%s exited with %d: %s" % (" ".join(command), process.returncode, "\n".join(lines)))
+        for name, self_us, cumulative_us, depth in parse_importtime(text):
+            if name in times:
+                self_us = min(self_us, times[name][0])
+                cumulative_us = min(cumulative_us, times[name][1])
+            times[name] = (self_us, cumulative_us, depth)
+    return times, wall
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measures the imports of an AI's tournament mode.")
+    parser.add_argument("col", type=int)
+    parser.add_argument("row", type=int)
+    parser.add_argument("p", type=int)
+    parser.add_argument("ai", help="main.py of the AI")
+    parser.add_argument("--runs", type=int, default=5, help="runs, the fastest time of every module is kept")
+    parser.add_argument("--top", type=int, default=10, help="number of the slowest modules listed")
+    parser.add_argument("--forbid", default=FORBIDDEN, help="comma separated modules tournament mode must not import")
+    parser.add_argument("--max-ms", type=float, default=None, help="budget of the AI's own imports in ms")
+    args = parser.parse_args()
+    path = os.path.abspath(args.ai)
+
+    interpreter, interpreter_wall = measure(["-c", "pass"], os.path.dirname(path), args.runs)
+    times, wall = measure([path, str(args.col), str(args.row), str(args.p), "t"], os.path.dirname(path), args.runs)
+    own = {name: value for name, value in times.items() if name not in interpreter}
+    total = sum(cumulative for _, cumulative, depth in own.values() if depth == 0) / 1000
+    print("%s %d %d %d t: %d modules imported, %d of them by the AI" % (path, args.col, args.row, args.p,
+                                                                      len(times), len(own)))
+    print("process %.1f ms, bare interpreter %.1f ms" % (wall * 1000, interpreter_wall * 1000))
+    print("imports of the AI %.1f ms, of the interpreter startup %.1f ms"
+          % (total, sum(cumulative for _, cumulative, depth in interpreter.values() if depth == 0) / 1000))
+    print("slowest modules (self time):")
+    for name, (self_us, cumulative_us, _) in sorted(own.items(), key=lambda item: -item[1][0])[:args.top]:
+        print("  %-30s %7.2f ms  (%.2f ms with its imports)" % (name, self_us / 1000, cumulative_us / 1000))
+
+    failed = False
+    forbidden = [name for name in own if name.split(".")[0] in args.forbid.split(",")]
+    if forbidden:
+        print("imported but not needed in tournament mode:", ", ".join(forbidden))
+        failed = True
+    if args.max_ms is not None and total > args.max_ms:
+        print("the imports of the AI take longer than %.1f ms" % args.max_ms)
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,35 +1,280 @@
-import threading
-import subprocess
-
-def run_command(command):
-    process = subprocess.Popen(command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-    commands = [
-        "python3 AI_Runner.py 8 8 3 l Sample_AIs/Poor_AI/main.py ../src/checkers-python/main.py",
-        "python3 AI_Runner.py 8 8 3 l ../src/checkers-python/main.py Sample_AIs/Poor_AI/main.py"
-    ]
-    stdout, stderr = process.communicate()
-    if stdout:
-        print(f"{stdout.decode().strip()}", end=" playing as: ")
-    if stderr:
-        print(f"{stderr.decode().strip()}", end=" playing as: ")
-
-    if (command == commands[0]):
-      print("player (2)")
+"""
+This module runs a match of many games between two AIs on a pool of processes and writes one record per game,
+so a change can be measured over hundreds of games instead of a handful.
+
+Every game is played by a worker process that starts both AIs the way AI_Runner does (through IOAI, so each
+AI gets its own clock of --time seconds), alternating which AI plays first. With --in-process, Python AIs are
+loaded into the worker with InProcessAI instead, which skips the subprocesses and pipes. With --warm, every worker
+keeps the AI processes of its finished games and starts the next game in them with the new game command of
+GameLogic's tournament mode, instead of starting a new interpreter per game. The record of a game has the
+players, which AI of the match played first, the winner, why the game ended, the moves and the time every move
+took. Wins are credited by seat, so an AI can play itself. Records are written as
+JSON lines, or as CSV if the output file ends with .csv, in the order the games were scheduled.
+
+e.g. "python3 runner.py 7 7 2 ../src/checkers-python/main.py Sample_AIs/Average_AI/main.py --games 20 --jobs 4"
+
+We are following the javadoc docstring format which is:
+@param tag describes the input parameters of the function
+@return tag describes what the function returns
+@raise tag describes the errors this function can raise
+"""
+import argparse
+import csv
+import json
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "Sample_AIs", "Average_AI"))
+
+from BoardClasses import Board, InvalidMoveError
+from Move import Move
+from AI_Extensions.IOAI import IOAI
+from AI_Extensions.InProcessAI import InProcessAI
+
+# environment variable AIs that plan their own clock read the game time from, e.g. AverageAI
+GAME_TIME_ENV = "CHECKERS_GAME_TIME"
+
+# AI processes of a worker that are between games, by path, with the paths whose AI has no new game command
+_warm = {}
+_cold = set()
+
+CSV_FIELDS = ["game", "col", "row", "p", "black", "white", "first", "winner", "winner_ai", "reason", "plies",
+              "duration", "black_time", "white_time", "moves", "move_times", "error"]
+
+
+def take_ai(path, col, row, p, timeout):
+    """
+    Gets an AI process for a game, a warm one of the worker if there is one and it takes a new game
+    @param path: main.py of the AI
+    @param col: no of columns in the board
+    @param row: no of rows in the board
+    @param p: no of rows to be filled with checker pieces at the start
+    @param timeout: seconds the AI gets for the game
+    @return ai: IOAI
+    """
+    while _warm.get(path):
+        ai = _warm[path].pop()
+        try:
+            ai.new_game(col, row, p)
+        except Exception:
+            # the AI exited or does not know the command, it is started cold from now on
+            for idle in [ai] + _warm.pop(path):
+                idle.close()
+            _cold.add(path)
+            break
+        ai.communicator.timeout = timeout
+        return ai
+    return IOAI(col, row, p, ai_path=path, time=timeout)
+
+
+def release_ai(path, ai):
+    """
+    Keeps the AI process of a finished game for the next game of the worker
+    @param path: main.py of the AI
+    @param ai: IOAI that finished its game normally
+    """
+    if path in _cold:
+        ai.close()
+    else:
+        _warm.setdefault(path, []).append(ai)
+
+
+def play_game(game):
+    """
+    Plays one game between two AI processes. Runs in a worker process.
+    @param game: dict with game, col, row, p, time, in_process, warm, black and white (paths of the AIs' main.py)
+                 and first ("ai_1" or "ai_2", the AI of the match that plays black)
+    @return record: dict with the fields of CSV_FIELDS, winner is 1, 2 or -1 for a tie, winner_ai is "ai_1",
+                    "ai_2" or "" and reason is one of "win", "tie", "crash", "timeout" or "invalid_move"
+    """
+    col, row, p = game["col"], game["row"], game["p"]
+    record = dict(game)
+    del record["time"], record["in_process"], record["warm"]
+    record.update(winner=0, reason="", error="", moves=[], move_times=[])
+    board = Board(col, row, p)
+    board.initialize_game()
+    players = []
+    warm = game["warm"] and not game["in_process"]
+    # the AI processes and in-process AIs created below inherit it
+    os.environ[GAME_TIME_ENV] = str(game["time"])
+    start = time.perf_counter()
+    try:
+        for path in (game["black"], game["white"]):
+            if warm:
+                players.append(take_ai(path, col, row, p, game["time"]))
+            elif game["in_process"]:
+                players.append(InProcessAI(col, row, p, ai_path=path, time=game["time"]))
+            else:
+                players.append(IOAI(col, row, p, ai_path=path, time=game["time"]))
+        player = 1
+        move = Move([])
+        while True:
+            move_start = time.perf_counter()
+            try:
+                move = players[player - 1].get_move(move)
+            except TimeoutError:
+                # the last thing the AI wrote to stderr, if it runs as a process, often says where it got stuck
+                communicator = getattr(players[player - 1], "communicator", None)
+                tail = communicator.stderr_tail().decode(errors="replace").strip().splitlines() if communicator else []
+                record.update(winner=3 - player, reason="timeout", error=tail[-1] if tail else "")
+                break
+            except Exception as e:
+                lines = str(e).strip().splitlines()
+                record.update(winner=3 - player, reason="crash", error=lines[-1] if lines else type(e).__name__)
+                break
+            finally:
+                record["move_times"].append(round(time.perf_counter() - move_start, 4))
+            try:
+                # make_move indexes the board with the squares of the move, off the board they would raise
+                # IndexError, or wrap around for negative ones. A single square would be played as a pass.
+                if len(move.seq) < 2 or not all(board.is_in_board(r, c) for r, c in move.seq):
+                    raise InvalidMoveError
+                board.make_move(move, player)
+            except (InvalidMoveError, IndexError):
+                record.update(winner=3 - player, reason="invalid_move", error=str(move))
+                break
+            record["moves"].append(str(move))
+            result = board.is_win(player)
+            if result != 0:
+                record.update(winner=result, reason="tie" if result == -1 else "win")
+                break
+            player = 3 - player
+    finally:
+        for i, ai in enumerate(players):
+            # an AI that lost by crashing, timing out or moving wrong may be in any state, it is not kept
+            if warm and (record["reason"] in ("win", "tie") or record["winner"] == i + 1):
+                release_ai((game["black"], game["white"])[i], ai)
+            else:
+                ai.close()
+    record["plies"] = len(record["moves"])
+    record["duration"] = round(time.perf_counter() - start, 3)
+    record["black_time"] = round(sum(record["move_times"][0::2]), 3)
+    record["white_time"] = round(sum(record["move_times"][1::2]), 3)
+    second = "ai_2" if game["first"] == "ai_1" else "ai_1"
+    record["winner_ai"] = {1: game["first"], 2: second}.get(record["winner"], "")
+    return record
+
+
+def schedule(args):
+    """
+    Lists the games of a match, the first AI plays black in the even games and white in the odd ones
+    @param args: parsed command line
+    @return games: list of the dicts play_game takes
+    """
+    games = []
+    for i in range(args.games):
+        black, white = (args.ai_1, args.ai_2) if i % 2 == 0 else (args.ai_2, args.ai_1)
+        games.append({"game": i, "col": args.col, "row": args.row, "p": args.p, "time": args.time,
+                      "in_process": args.in_process, "warm": args.warm, "black": black, "white": white,
+                      "first": "ai_1" if i % 2 == 0 else "ai_2"})
+    return games
+
+
+def summarize(records, ai="ai_1"):
+    """
+    Score of one AI over a match with a 95% confidence interval, wins count 1 and ties 1/2. The AIs are told
+    apart by their seat in the match, not by their path, so a match of an AI against itself is scored too.
+    Games that could not be played have no winner, they are counted as errors and left out of the score.
+    @param records: records returned by play_game
+    @param ai: AI to score, "ai_1" or "ai_2"
+    @return: dict with games, errors, wins, losses, ties, score, low, high, elo and the reasons games ended,
+             games counts the scored games only
+    """
+    errors = sum(1 for r in records if r["winner"] not in (1, 2, -1))
+    n = len(records) - errors
+    wins = sum(1 for r in records if r["winner_ai"] == ai)
+    ties = sum(1 for r in records if r["winner"] == -1)
+    losses = n - wins - ties
+    score = (wins + 0.5 * ties) / n if n else 0.0
+    # Wilson interval of the score, which stays inside [0, 1] and is not empty when every game went one way
+    z = 1.96
+    if n:
+        center = (score + z * z / (2 * n)) / (1 + z * z / n)
+        margin = z / (1 + z * z / n) * math.sqrt(score * (1 - score) / n + z * z / (4 * n * n))
+    else:
+        center = margin = 0.0
+    if 0 < score < 1:
+        elo = -400 * math.log10(1 / score - 1)
     else:
-      print("player (1)")
+        elo = math.copysign(float("inf"), score - 0.5)
+    reasons = {}
+    for r in records:
+        reasons[r["reason"]] = reasons.get(r["reason"], 0) + 1
+    return {"games": n, "errors": errors, "wins": wins, "losses": losses, "ties": ties, "score": score,
+            "low": center - margin, "high": center + margin, "elo": elo, "reasons": reasons}
+
+
+def write_records(records, path):
+    """
+    Writes the records as JSON lines, or as CSV with the moves and move times joined by spaces
+    @param records: records returned by play_game
+    @param path: output file, CSV if it ends with .csv
+    """
+    with open(path, "w", newline="") as fh:
+        if path.endswith(".csv"):
+            writer = csv.DictWriter(fh, fieldnames=CSV_FIELDS)
+            writer.writeheader()
+            for r in records:
+                row = dict(r)
+                row["moves"] = " ".join(r["moves"])
+                row["move_times"] = " ".join(str(t) for t in r["move_times"])
+                writer.writerow(row)
+        else:
+            for r in records:
+                fh.write(json.dumps(r) + "\n")
+
 
 def main():
-    commands = [
-        "python3 AI_Runner.py 8 8 3 l Sample_AIs/Poor_AI/main.py ../src/checkers-python/main.py",
-        "python3 AI_Runner.py 8 8 3 l ../src/checkers-python/main.py Sample_AIs/Poor_AI/main.py"
-    ]
-    threads = [threading.Thread(target=run_command, args=(cmd,)) for cmd in commands for _ in range(10)]
-    
-    for thread in threads:
-        thread.start()
-    
-    for thread in threads:
-        thread.join()
+    parser = argparse.ArgumentParser(description="Plays a match between two AIs on a pool of processes.")
+    parser.add_argument("col", type=int)
+    parser.add_argument("row", type=int)
+    parser.add_argument("p", type=int)
+    parser.add_argument("ai_1", help="main.py of the first AI, the one the score is reported for")
+    parser.add_argument("ai_2", help="main.py of the second AI")
+    parser.add_argument("--games", type=int, default=20, help="number of games, colors alternate")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="games played at the same time")
+    parser.add_argument("--time", type=float, default=1200, help="seconds each AI gets for a whole game")
+    parser.add_argument("--in-process", action="store_true", help="load Python AIs into the workers")
+    parser.add_argument("--warm", action="store_true", help="play the games of a worker in the same AI processes")
+    parser.add_argument("--out", default="results.jsonl", help="results file, .jsonl or .csv")
+    args = parser.parse_args()
+    args.ai_1 = os.path.abspath(args.ai_1)
+    args.ai_2 = os.path.abspath(args.ai_2)
+
+    games = schedule(args)
+    records = [None] * len(games)
+    start = time.time()
+    with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        pending = {pool.submit(play_game, game): game for game in games}
+        for future in as_completed(pending):
+            game = pending[future]
+            try:
+                record = future.result()
+            except Exception as e:
+                # the game could not be played at all, e.g. an AI could not be started
+                record = dict(game, winner=0, winner_ai="", reason="error", error=repr(e), moves=[], move_times=[],
+                              plies=0, duration=0.0, black_time=0.0, white_time=0.0)
+                del record["time"], record["in_process"], record["warm"]
+            records[game["game"]] = record
+            print("game %d (%s first): %s, winner %s after %d plies in %.1fs"
+                  % (record["game"], record["first"], record["reason"], record["winner"], record["plies"],
+                     record["duration"]))
+    write_records(records, args.out)
+
+    summary = summarize(records)
+    print("%s vs %s, %dx%d p=%d, %d games in %.1fs"
+          % (args.ai_1, args.ai_2, args.col, args.row, args.p, len(records), time.time() - start))
+    print("wins %d, losses %d, ties %d, score %.3f (95%% CI %.3f-%.3f), elo %+.0f"
+          % (summary["wins"], summary["losses"], summary["ties"], summary["score"], summary["low"],
+             summary["high"], summary["elo"]))
+    if summary["errors"]:
+        print("%d games could not be played and are not scored" % summary["errors"])
+    print("ended by:", ", ".join("%s %d" % item for item in sorted(summary["reasons"].items())))
+    print("results written to", args.out)
+
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
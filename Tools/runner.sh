@@ -1,16 +1,5 @@
 #!/bin/bash
 
-echo "Running tests in parallel..."
-
-run_test() {
-  python3 AI_Runner.py 7 7 2 l "$1" "$2"
-}
-
-export -f run_test
-
-# Run 10 tests for each case in parallel (total of 20 tests)
-echo "Going First"
-seq 10 | xargs -n1 -P10 bash -c 'run_test "../src/checkers-python/main.py" "Sample_AIs/Average_AI/main.py"'
-
-echo "Going Second"
-seq 10 | xargs -n1 -P10 bash -c 'run_test "Sample_AIs/Average_AI/main.py" "../src/checkers-python/main.py"'
+# Plays 20 games of our AI against the Average AI on 7x7 with p=2, 10 going first and 10 going second,
+# 10 at a time. Extra arguments go to runner.py, e.g. "./runner.sh --games 200 --out avg.csv"
+python3 runner.py 7 7 2 ../src/checkers-python/main.py Sample_AIs/Average_AI/main.py --games 20 --jobs 10 "$@"
@@ -0,0 +1,113 @@
+"""
+This module houses the InProcessAI which plays a Python AI from another directory inside this process, calling
+its get_move directly instead of going through a subprocess and text pipes like IOAI.
+
+Every AI directory ships its own BoardClasses, Move, Checker and so on, with the same module names. The AI's
+modules are imported into their own namespace: while they load, and during every get_move, sys.modules holds
+the AI's own copies of those names, and the caller's copies are put back afterwards.
+
+We are following the javadoc docstring format which is:
+@param tag describes the input parameters of the function
+@return tag describes what the function returns
+@raise tag describes the errors this function can raise
+"""
+
+import importlib
+import os
+import re
+import sys
+import time
+
+
+def find_ai_module(directory):
+    """
+    Finds the module that defines the StudentAI class of an AI directory: StudentAI.py, or else the module
+    its GameLogic.py imports StudentAI from (e.g. AverageAI for the Average AI)
+    @param directory: directory of the AI
+    @return name: module name
+    @raise ImportError: if neither is found
+    """
+    if os.path.exists(os.path.join(directory, "StudentAI.py")):
+        return "StudentAI"
+    game_logic = os.path.join(directory, "GameLogic.py")
+    if os.path.exists(game_logic):
+        with open(game_logic) as fh:
+            match = re.search(r"^from (\w+) import StudentAI", fh.read(), re.MULTILINE)
+        if match:
+            return match.group(1)
+    raise ImportError("No StudentAI found in " + directory)
+
+
+class InProcessAI():
+    """
+    This class describes InProcessAI
+    """
+    def __init__(self,col,row,p,**kwargs):
+        """
+        Loads the AI and creates its StudentAI
+        @param col: no of columns in the board
+        @param row: no of rows in the board
+        @param p: no of rows to be filled with checker pieces at the start
+        @param ai_path: the AI's directory or its main.py
+        @param time: seconds the AI gets for the whole game, like the timeout of IOAI
+        """
+        path = os.path.abspath(kwargs['ai_path'])
+        self.directory = path if os.path.isdir(path) else os.path.dirname(path)
+        self.timeout = kwargs.get('time', 1200)
+        self.accumulated_time = 0
+        # every module name the directory defines belongs to the AI, whatever the caller has loaded under it
+        self.names = set()
+        for entry in os.listdir(self.directory):
+            if entry.endswith(".py") or entry.endswith(".pyc"):
+                self.names.add(entry.rsplit(".", 1)[0])
+            elif os.path.exists(os.path.join(self.directory, entry, "__init__.py")):
+                self.names.add(entry)
+        self.modules = {}
+        sys.path.insert(0, self.directory)
+        try:
+            with self:
+                module = importlib.import_module(find_ai_module(self.directory))
+                self.Move = importlib.import_module("Move").Move
+                self.ai = module.StudentAI(col, row, p)
+        finally:
+            sys.path.remove(self.directory)
+
+    def __enter__(self):
+        """
+        Puts the AI's modules in sys.modules, keeping the caller's ones aside
+        """
+        self.saved = {}
+        for name in list(sys.modules):
+            if name.split(".")[0] in self.names:
+                self.saved[name] = sys.modules.pop(name)
+        sys.modules.update(self.modules)
+        return self
+
+    def __exit__(self, *exc):
+        """
+        Takes the AI's modules out of sys.modules, so they are reused on the next call, and puts the caller's back
+        """
+        for name in list(sys.modules):
+            if name.split(".")[0] in self.names:
+                self.modules[name] = sys.modules.pop(name)
+        sys.modules.update(self.saved)
+        return False
+
+    def get_move(self,move):
+        """
+        get_move of the AI, called from the gameloop in the main module.
+        @param move: A Move object describing the opponent's move, of any namespace.
+        @return res_move: The Move object the AI returns, of the AI's own Move class.
+        @raise TimeoutError: if the AI used up its time for the game with this move
+        """
+        start = time.time()
+        with self:
+            # the AI gets the move as its own Move class, so it can use whatever methods its version has
+            res_move = self.ai.get_move(self.Move(move.seq))
+        self.accumulated_time += time.time() - start
+        if self.accumulated_time > self.timeout:
+            raise TimeoutError
+        return res_move
+
+    def close(self):
+        pass
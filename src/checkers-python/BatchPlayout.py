@@ -0,0 +1,240 @@
+"""
+This module has the BatchPlayout Class which plays thousands of random games at once on NumPy arrays, so a
+search can score a leaf with many playouts for about the cost of a few played one by one through Board.
+
+The rules are the ones of Board: black men move down the rows and white men up, captures are mandatory,
+a capture goes on while the capturing piece can jump again, a man reaching the last row becomes a king
+and its move ends there, and tie_max moves in a row without a capture is a tie. A game is lost by the
+player who has no move (or no piece) on their turn. Every legal jump is equally likely at each step of a
+multiple jump, rather than every full capture sequence being equally likely.
+
+We are following the javadoc docstring format which is:
+@param tag describes the input parameters of the function
+@return tag describes what the function returns
+@raise tag describes the errors this function can raise
+"""
+
+import numpy as np
+
+# square values of an encoded position, black is positive so the position seen by the other side is the
+# position multiplied by -1
+EMPTY = 0
+BLACK_MAN = 1
+BLACK_KING = 2
+WHITE_MAN = -1
+WHITE_KING = -2
+WALL = 64  # padding around the board, neither a piece nor an empty square for either side
+
+PAD = 2  # a jump looks two squares away, the padding keeps every look inside the array
+DIRECTIONS = ((1, -1), (1, 1), (-1, -1), (-1, 1))
+
+_codes = {("B", False): BLACK_MAN, ("B", True): BLACK_KING, ("W", False): WHITE_MAN, ("W", True): WHITE_KING}
+
+
+class BatchPlayout:
+    """
+    This class describes BatchPlayout. Games are int8 arrays of shape (games, row + 4, col + 4): the board
+    with two squares of WALL on every side.
+    """
+    def __init__(self, col, row, tie_max=40):
+        """
+        Intializes the engine for a board size
+        @param col: number of columns in the board
+        @param row: number of rows in the board
+        @param tie_max: moves in a row without a capture that end the game in a tie, Board uses 40
+        """
+        self.col = col
+        self.row = row
+        self.tie_max = tie_max
+
+    def encode(self, board):
+        """
+        Encodes one board
+        @param board: Board or BitBoard
+        @return: int8 array of shape (row, col)
+        """
+        return np.array([[_codes.get((checker.color, checker.is_king), EMPTY) for checker in board_row]
+                         for board_row in board.board], dtype=np.int8)
+
+    def _pad(self, positions):
+        """
+        Surrounds a batch of encoded positions with WALL squares
+        @param positions: int8 array of shape (games, row, col)
+        @return: int8 array of shape (games, row + 4, col + 4)
+        """
+        padded = np.full((len(positions), self.row + 2 * PAD, self.col + 2 * PAD), WALL, dtype=np.int8)
+        padded[:, PAD:PAD + self.row, PAD:PAD + self.col] = positions
+        return padded
+
+    def _shifted(self, grid, distance, direction):
+        """
+        @return: view of grid where square (r, c) holds the square distance steps away in direction
+        """
+        dr, dc = direction
+        r = PAD + distance * dr
+        c = PAD + distance * dc
+        return grid[:, r:r + self.row, c:c + self.col]
+
+    def play(self, positions, colors, max_plies=200, rng=None, tie_counter=0):
+        """
+        Plays one random game from each position
+        @param positions: int8 array of shape (games, row, col) from encode
+        @param colors: player to move in every game, 1 or 2, an int or an array of shape (games,)
+        @param max_plies: games still going after this many moves are returned as 0
+        @param rng: numpy Generator, a new unseeded one if None
+        @param tie_counter: moves without a capture already played before the positions, as Board.tie_counter,
+                            an int or an array of shape (games,)
+        @return results, final: int array of shape (games,) with the winning player, -1 for a tie or 0 for
+                                unfinished, and int8 array of shape (games, row, col) with the positions the
+                                games ended in, e.g. to decide the unfinished ones with leader
+        """
+        if rng is None:
+            rng = np.random.default_rng()
+        grid = self._pad(np.asarray(positions, dtype=np.int8))
+        games = len(grid)
+        side = np.where(np.broadcast_to(colors, (games,)) == 1, 1, -1).astype(np.int8)
+        result = np.zeros(games, dtype=np.int64)
+        tie_counter = np.array(np.broadcast_to(tie_counter, (games,)), dtype=np.int64)
+        active = np.arange(games)
+        forward = np.array([dr for dr, _ in DIRECTIONS], dtype=np.int8)
+        for _ in range(max_plies):
+            if len(active) == 0:
+                break
+            board = grid[active] * side[active, None, None]  # the player to move is positive
+            own_man = self._shifted(board, 0, (0, 0)) == 1
+            own_king = self._shifted(board, 0, (0, 0)) == 2
+            # men only go forward: down the rows (+1) for black, up (-1) for white
+            may_go = own_king[:, None] | (own_man[:, None] & (forward[None, :] == side[active, None])[:, :, None, None])
+            near = np.stack([self._shifted(board, 1, d) for d in DIRECTIONS], axis=1)
+            far = np.stack([self._shifted(board, 2, d) for d in DIRECTIONS], axis=1)
+            jumps = may_go & ((near == -1) | (near == -2)) & (far == 0)
+            steps = may_go & (near == 0)
+            can_jump = jumps.reshape(len(active), -1).any(axis=1)
+            actions = np.where(can_jump[:, None], jumps.reshape(len(active), -1), steps.reshape(len(active), -1))
+            counts = actions.sum(axis=1)
+
+            stuck = counts == 0
+            result[active[stuck]] = np.where(side[active[stuck]] == 1, 2, 1)
+            moving = ~stuck
+            games_moving = active[moving]
+            choice = self._pick(actions[moving], counts[moving], rng)
+            d, r, c = np.unravel_index(choice, (len(DIRECTIONS), self.row, self.col))
+            r = r + PAD
+            c = c + PAD
+            distance = np.where(can_jump[moving], 2, 1)
+            tie_counter[games_moving] = np.where(can_jump[moving], 0, tie_counter[games_moving] + 1)
+            r, c, continuing = self._apply(grid, games_moving, r, c, d, distance)
+
+            # a capture goes on from where the piece landed while it can jump again
+            while len(continuing):
+                g = games_moving[continuing]
+                r, c = r[continuing], c[continuing]
+                piece = grid[g, r, c] * side[g]
+                options = np.zeros((len(g), len(DIRECTIONS)), dtype=bool)
+                for i, (dr, dc) in enumerate(DIRECTIONS):
+                    allowed = (piece == 2) | (dr == side[g])
+                    victim = grid[g, r + dr, c + dc] * side[g]
+                    options[:, i] = allowed & ((victim == -1) | (victim == -2)) & (grid[g, r + 2 * dr, c + 2 * dc] == 0)
+                more = options.any(axis=1)
+                g, r, c, options = g[more], r[more], c[more], options[more]
+                if len(g) == 0:
+                    break
+                d = self._pick(options, options.sum(axis=1), rng)
+                games_moving = g
+                r, c, continuing = self._apply(grid, g, r, c, d, np.full(len(g), 2))
+
+            tied = active[moving][tie_counter[active[moving]] >= self.tie_max]
+            result[tied] = -1
+            side[active] = -side[active]
+            active = active[result[active] == 0]
+        return result, grid[:, PAD:PAD + self.row, PAD:PAD + self.col]
+
+    def _pick(self, actions, counts, rng):
+        """
+        Picks one allowed action per game, uniformly
+        @param actions: bool array of shape (games, actions)
+        @param counts: number of allowed actions of every game, all above 0
+        @return: index of the picked action of every game
+        """
+        wanted = (rng.random(len(counts)) * counts).astype(np.int64)
+        return np.argmax(np.cumsum(actions, axis=1) > wanted[:, None], axis=1)
+
+    def _apply(self, grid, games, r, c, d, distance):
+        """
+        Moves one piece per game, removing the jumped piece and crowning men that reach the last row
+        @param grid: padded positions, changed in place
+        @param games: index of every moving game in grid
+        @param r: padded row of every moving piece
+        @param c: padded col of every moving piece
+        @param d: index in DIRECTIONS of every move
+        @param distance: 1 for a step, 2 for a jump
+        @return r, c, continuing: where the pieces landed and which of them may jump again
+        """
+        dirs = np.array(DIRECTIONS)[d]
+        piece = grid[games, r, c]
+        grid[games, r, c] = EMPTY
+        jumped = distance == 2
+        grid[games[jumped], r[jumped] + dirs[jumped, 0], c[jumped] + dirs[jumped, 1]] = EMPTY
+        r = r + distance * dirs[:, 0]
+        c = c + distance * dirs[:, 1]
+        crowned = ((piece == BLACK_MAN) & (r == PAD + self.row - 1)) | ((piece == WHITE_MAN) & (r == PAD))
+        grid[games, r, c] = np.where(crowned, piece * 2, piece)
+        return r, c, np.nonzero(jumped & ~crowned)[0]
+
+    def leader(self, positions):
+        """
+        Decides games by material with the weights of StudentAI's winning: men count 1, and kings 1.5 with
+        more than 20 pieces on the board, 2 with 10 to 20 and 3 with fewer than 10
+        @param positions: int8 array of shape (games, row, col), or padded
+        @return: int array of shape (games,) with the player ahead, or -1 if material is even
+        """
+        positions = np.asarray(positions)
+        flat = positions.reshape(len(positions), -1)
+        black_men = (flat == BLACK_MAN).sum(axis=1)
+        black_kings = (flat == BLACK_KING).sum(axis=1)
+        white_men = (flat == WHITE_MAN).sum(axis=1)
+        white_kings = (flat == WHITE_KING).sum(axis=1)
+        pieces = black_men + black_kings + white_men + white_kings
+        king_weight = np.where(pieces > 20, 1.5, np.where(pieces >= 10, 2.0, 3.0))
+        black = black_men + king_weight * black_kings
+        white = white_men + king_weight * white_kings
+        return np.where(black > white, 1, np.where(white > black, 2, -1))
+
+
+if __name__ == "__main__":
+    import time
+    import random
+    from BoardClasses import Board
+
+    # outcome rates of random games from the 8x8 opening, played one by one on Board and in a batch
+    games = 2000
+    random.seed(0)
+    start = time.perf_counter()
+    board_results = {1: 0, 2: 0, -1: 0, 0: 0}
+    for _ in range(games // 10):
+        board = Board(8, 8, 3)
+        board.initialize_game()
+        turn, result = 1, 0
+        for _ in range(200):
+            moves = board.get_all_possible_moves(turn)
+            if not moves:
+                result = 3 - turn
+                break
+            board.make_move(random.choice(random.choice(moves)), turn)
+            result = board.is_win(turn)
+            if result != 0:
+                break
+            turn = 3 - turn
+        board_results[result] += 1
+    board_time = (time.perf_counter() - start) / (games // 10)
+
+    engine = BatchPlayout(8, 8)
+    board = Board(8, 8, 3)
+    board.initialize_game()
+    positions = np.repeat(engine.encode(board)[None], games, axis=0)
+    start = time.perf_counter()
+    results, _ = engine.play(positions, 1, 200, np.random.default_rng(0))
+    batch_time = (time.perf_counter() - start) / games
+    batch_results = {k: int((results == k).sum()) for k in (1, 2, -1, 0)}
+    print("Board: %d games, %.0f us per game, %s" % (games // 10, board_time * 1e6, board_results))
+    print("Batch: %d games, %.0f us per game, %s" % (games, batch_time * 1e6, batch_results))
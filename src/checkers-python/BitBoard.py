@@ -0,0 +1,500 @@
+"""
+This module has the BitBoard Class which is an alternative to the Board Class. Instead of a grid of
+Checker objects it stores the men and kings of each player as Python ints used as bitmasks, and
+generates moves with shifts and masks.
+
+We are following the javadoc docstring format which is:
+@param tag describes the input parameters of the function
+@return tag describes what the function returns
+@raise tag describes the errors this function can raise
+"""
+
+from Move import Move
+from BoardClasses import Board
+from BoardClasses import InvalidMoveError
+import Checker
+from Zobrist import get_table
+from MoveCache import MoveCache
+
+
+def _shift(bits, offset):
+    """
+    Shifts a bitmask by a signed offset. Internal function
+    @param bits: bitmask to shift
+    @param offset: positive shifts towards higher squares, negative towards lower squares
+    @return: the shifted bitmask
+    """
+    if offset >= 0:
+        return bits << offset
+    return bits >> -offset
+
+
+class BitBoard:
+    """
+    This class describes BitBoard. It has the same interface as Board (get_all_possible_moves, make_move,
+    undo, is_win) so the AIs can switch between the two engines.
+
+    Square (r,c) is stored at bit r*(col+1)+c. The extra column at the end of every row is never part of
+    the board, so a piece shifted off the left or right edge lands on it and is masked away.
+    """
+    opponent = {"W": "B", "B": "W"}
+
+    def __init__(self, col, row, p):
+        """
+        Intializes an empty bitboard with the same (col,row,p) parameters as Board.
+        @param col: number of columns in the board
+        @param row: number of rows in the board
+        @param p: number of rows to be filled with checker pieces at the start
+        @return :
+        @raise :
+        """
+        self.tie_counter = 0
+        self.tie_max = 40
+        self.row = row
+        self.col = col
+        self.p = p
+        self.stride = col + 1
+        self.squares = 0
+        for r in range(row):
+            self.squares |= ((1 << col) - 1) << (r * self.stride)
+        self.coords = [(i // self.stride, i % self.stride) for i in range(row * self.stride)]
+        forward = {"B": (self.stride - 1, self.stride + 1), "W": (-self.stride - 1, -self.stride + 1)}
+        # men move forward only, kings try their own directions first and then the opponent's,
+        # which is the order Checker.get_possible_moves explores them in
+        self.man_directions = forward
+        self.king_directions = {"B": forward["B"] + forward["W"], "W": forward["W"] + forward["B"]}
+        self.black_men = 0
+        self.black_kings = 0
+        self.white_men = 0
+        self.white_kings = 0
+        self.black_count = 0
+        self.white_count = 0
+        self.zobrist_table = get_table(col, row)
+        self.zobrist_key = 0
+        self.move_cache = MoveCache()
+        self.saved_move = []
+
+    @classmethod
+    def from_board(cls, board):
+        """
+        Builds a BitBoard holding the same position as an object Board
+        @param board: Board object to convert
+        @return bitboard: a BitBoard with the same pieces, counters and tie counter
+        """
+        bitboard = cls(board.col, board.row, board.p)
+        for r in range(board.row):
+            for c in range(board.col):
+                checker = board.board[r][c]
+                if checker.color == ".":
+                    continue
+                bit = 1 << (r * bitboard.stride + c)
+                if checker.color == "B":
+                    if checker.is_king:
+                        bitboard.black_kings |= bit
+                    else:
+                        bitboard.black_men |= bit
+                    bitboard.black_count += 1
+                else:
+                    if checker.is_king:
+                        bitboard.white_kings |= bit
+                    else:
+                        bitboard.white_men |= bit
+                    bitboard.white_count += 1
+        bitboard.zobrist_key = board.zobrist_key
+        bitboard.tie_counter = board.tie_counter
+        bitboard.tie_max = board.tie_max
+        return bitboard
+
+    def initialize_game(self):
+        """
+        Intializes game. The starting layout is taken from Board.initialize_game so both engines always
+        agree on where the pieces start.
+        @param :
+        @return :
+        @raise InvalidParameterError: raises this exception if (col,row,p) is not a legal configuration
+        """
+        board = Board(self.col, self.row, self.p)
+        board.initialize_game()
+        start = BitBoard.from_board(board)
+        self.black_men, self.black_kings = start.black_men, start.black_kings
+        self.white_men, self.white_kings = start.white_men, start.white_kings
+        self.black_count, self.white_count = start.black_count, start.white_count
+        self.zobrist_key = start.zobrist_key
+        self.tie_counter = 0
+        self.saved_move = []
+
+    def _color(self, color):
+        """
+        Converts a player number into its color letter. Internal function
+        @param color: 1, 2, 'B' or 'W'
+        @return: 'B' or 'W'
+        @raise InvalidMoveError: if color is a number other than 1 or 2
+        """
+        if type(color) is int:
+            if color == 1:
+                return 'B'
+            elif color == 2:
+                return 'W'
+            raise InvalidMoveError
+        return color
+
+    def _pieces(self, color):
+        """
+        Returns the bitmasks from the point of view of one player. Internal function
+        @param color: 'B' or 'W'
+        @return: men, kings, opponent men, opponent kings
+        """
+        if color == "B":
+            return self.black_men, self.black_kings, self.white_men, self.white_kings
+        return self.white_men, self.white_kings, self.black_men, self.black_kings
+
+    def _jumpers(self, color, men, kings, opp, empty):
+        """
+        Finds every piece that has at least one capture available. Internal function
+        @return: bitmask of the pieces that can jump
+        """
+        jumpers = 0
+        forward = self.man_directions[color]
+        for d in self.king_directions[color]:
+            movers = men | kings if d in forward else kings
+            jumpers |= _shift(_shift(empty, -d) & opp, -d) & movers
+        return jumpers
+
+    def _jump_paths(self, idx, directions, opp, empty, path, multiple_jump):
+        """
+        Internal helper for get_all_possible_moves, the bitboard version of Checker.binary_tree_traversal.
+        Captured pieces are removed from opp and added to empty while their branch is explored.
+        @param idx: bit index of the square the jumping piece is on
+        @param directions: bit offsets the piece may move in
+        @param opp: bitmask of the opponent pieces left
+        @param empty: bitmask of the empty squares
+        @param path: the move chain explored so far
+        @param multiple_jump: list the finished move chains are appended to
+        """
+        jumped = False
+        for d in directions:
+            land = idx + d + d
+            if land >= 0 and (empty >> land) & 1 and (opp >> (idx + d)) & 1:
+                jumped = True
+                captured = 1 << (idx + d)
+                path.append(self.coords[land])
+                self._jump_paths(land, directions, opp ^ captured, empty | captured, path, multiple_jump)
+                path.pop()
+        if not jumped and len(path) > 1:
+            multiple_jump.append(list(path))
+
+    def get_all_possible_moves(self, color):
+        """
+        this function returns the all possible moves of the player whose turn it is. The moves are grouped
+        per checker and ordered exactly like Board.get_all_possible_moves, and cached the same way.
+        @param color: color of the player whose turn it is
+        @return result: a list of Move objects which describe possible moves
+        @raise :
+        """
+        color = self._color(color)
+        key = (self.zobrist_key, color)
+        result = self.move_cache.get(key)
+        if result is None:
+            result = self._generate_all_possible_moves(color)
+            self.move_cache.put(key, result)
+        return result
+
+    def _generate_all_possible_moves(self, color):
+        """
+        Generates the moves of get_all_possible_moves with shifts and masks. Internal function
+        @param color: 'B' or 'W'
+        @return result: a list of Move objects which describe possible moves
+        """
+        men, kings, opp_men, opp_kings = self._pieces(color)
+        opp = opp_men | opp_kings
+        empty = self.squares & ~(men | kings | opp)
+        coords = self.coords
+        result = []
+        jumpers = self._jumpers(color, men, kings, opp, empty)
+        if jumpers:
+            while jumpers:
+                low = jumpers & -jumpers
+                jumpers ^= low
+                idx = low.bit_length() - 1
+                directions = self.king_directions[color] if kings & low else self.man_directions[color]
+                multiple_jump = []
+                self._jump_paths(idx, directions, opp, empty | low, [coords[idx]], multiple_jump)
+                result.append([Move(jump) for jump in multiple_jump])
+            return result
+
+        movers = 0
+        forward = self.man_directions[color]
+        for d in self.king_directions[color]:
+            movers |= _shift(empty, -d) & (men | kings if d in forward else kings)
+        while movers:
+            low = movers & -movers
+            movers ^= low
+            idx = low.bit_length() - 1
+            directions = self.king_directions[color] if kings & low else forward
+            moves = []
+            for d in directions:
+                target = idx + d
+                if target >= 0 and (empty >> target) & 1:
+                    moves.append(Move([coords[idx], coords[target]]))
+            result.append(moves)
+        return result
+
+    def make_move(self, move, turn):
+        """
+        Makes Move on the board. The new bitmasks are computed on local variables and only stored once
+        the whole move has been checked, so a rejected move leaves the board untouched.
+        @param move: Move object provided by the StudentAI, Uses this parameter to make the move on the board
+        @param turn: this parameter tracks the current turn. either player 1 (black) or player 2 (white)
+        @return:
+        @raise InvalidMoveError: raises this objection if the move provided isn't valid on the current board
+        """
+        turn = self._color(turn)
+        men, kings, opp_men, opp_kings = self._pieces(turn)
+        stride = self.stride
+        seq = move.seq
+        if len(seq) < 2:
+            raise InvalidMoveError
+        cur_row, cur_col = seq[0]
+        if not (0 <= cur_row < self.row and 0 <= cur_col < self.col):
+            raise InvalidMoveError
+        bit = 1 << (cur_row * stride + cur_col)
+        if kings & bit:
+            is_king = True
+            kings ^= bit
+        elif men & bit:
+            is_king = False
+            men ^= bit
+        else:
+            raise InvalidMoveError
+        table = self.zobrist_table
+        key = self.zobrist_key ^ table.side ^ table.piece(turn, is_king, cur_row, cur_col)
+        opp_color = self.opponent[turn]
+        forward = 1 if turn == "B" else -1
+        last_row = self.row - 1 if turn == "B" else 0
+        captured = 0
+        tie_counter = self.tie_counter + 1
+        for target_row, target_col in seq[1:]:
+            diff_row, diff_col = target_row - cur_row, target_col - cur_col
+            if not (0 <= target_row < self.row and 0 <= target_col < self.col):
+                raise InvalidMoveError
+            if abs(diff_row) != abs(diff_col) or abs(diff_row) not in (1, 2):
+                raise InvalidMoveError
+            if not is_king and diff_row * forward < 0:
+                raise InvalidMoveError
+            target = 1 << (target_row * stride + target_col)
+            if (men | kings | opp_men | opp_kings) & target:
+                raise InvalidMoveError
+            if abs(diff_row) == 2:
+                middle_row, middle_col = cur_row + diff_row // 2, cur_col + diff_col // 2
+                middle = 1 << (middle_row * stride + middle_col)
+                if opp_men & middle:
+                    opp_men ^= middle
+                    key ^= table.piece(opp_color, False, middle_row, middle_col)
+                elif opp_kings & middle:
+                    opp_kings ^= middle
+                    key ^= table.piece(opp_color, True, middle_row, middle_col)
+                else:
+                    raise InvalidMoveError
+                captured += 1
+                tie_counter = 0
+            cur_row, cur_col, bit = target_row, target_col, target
+            if not is_king and cur_row == last_row:
+                # a man that reaches the last row becomes king and its move ends there
+                is_king = True
+                break
+        if is_king:
+            kings |= bit
+        else:
+            men |= bit
+        key ^= table.piece(turn, is_king, cur_row, cur_col)
+
+        self.saved_move.append((self.black_men, self.black_kings, self.white_men, self.white_kings,
+                                self.black_count, self.white_count, self.tie_counter, self.zobrist_key))
+        if turn == "B":
+            self.black_men, self.black_kings, self.white_men, self.white_kings = men, kings, opp_men, opp_kings
+            self.white_count -= captured
+        else:
+            self.white_men, self.white_kings, self.black_men, self.black_kings = men, kings, opp_men, opp_kings
+            self.black_count -= captured
+        self.tie_counter = tie_counter
+        self.zobrist_key = key
+
+    def undo(self):
+        """
+        Takes back the last move made with make_move
+        @param :
+        @return :
+        @raise Exception: if there is no move to undo
+        """
+        if not self.saved_move:
+            raise Exception("Cannot undo operation")
+        (self.black_men, self.black_kings, self.white_men, self.white_kings,
+         self.black_count, self.white_count, self.tie_counter, self.zobrist_key) = self.saved_move.pop()
+
+    def snapshot(self):
+        """
+        Marks the current position so it can be returned to with restore, without copying the board
+        @param :
+        @return ply: number of moves on saved_move
+        """
+        return len(self.saved_move)
+
+    def restore(self, ply):
+        """
+        Takes back every move made after snapshot returned ply. Every saved_move entry holds the whole
+        state before its move, so this is a single assignment whatever the number of moves.
+        @param ply: value returned by snapshot
+        @return :
+        """
+        if len(self.saved_move) > ply:
+            (self.black_men, self.black_kings, self.white_men, self.white_kings,
+             self.black_count, self.white_count, self.tie_counter, self.zobrist_key) = self.saved_move[ply]
+            del self.saved_move[ply:]
+
+    def has_any_move(self, color):
+        """
+        Checks if the player has at least one legal move, with the same masks get_all_possible_moves
+        starts from but without building any Move
+        @param color: color of the player to check
+        @return: a bool which is True if the player can move
+        """
+        color = self._color(color)
+        men, kings, opp_men, opp_kings = self._pieces(color)
+        if not (men | kings):
+            return False
+        opp = opp_men | opp_kings
+        empty = self.squares & ~(men | kings | opp)
+        forward = self.man_directions[color]
+        for d in self.king_directions[color]:
+            movers = men | kings if d in forward else kings
+            if _shift(empty, -d) & movers or _shift(_shift(empty, -d) & opp, -d) & movers:
+                return True
+        return False
+
+    def is_win(self, turn):
+        """
+        this function tracks if any player has won. Follows the same rules as Board.is_win
+        @param turn: the player who just moved
+        @return : 0 if the game goes on, -1 for a tie, otherwise the number of the winning player
+        @raise :
+        """
+        if turn == "W":
+            turn = 2
+        elif turn == "B":
+            turn = 1
+        if self.tie_counter >= self.tie_max:
+            return -1
+        W_has_move = True
+        B_has_move = True
+        if not self.has_any_move(1):
+            if turn != 1:
+                B_has_move = False
+        elif not self.has_any_move(2):
+            if turn != 2:
+                W_has_move = False
+
+        if W_has_move and not B_has_move:
+            return 2
+        elif not W_has_move and B_has_move:
+            return 1
+
+        W = self.white_count == 0
+        B = self.black_count == 0
+        if not W and not B:
+            return 0
+        if W:
+            return 2
+        elif B:
+            return 1
+        else:
+            return 0
+
+    @property
+    def board(self):
+        """
+        Builds a grid of Checker objects like Board.board, for code that reads the squares directly.
+        The grid is a fresh copy, so writing to it does not change the bitboard.
+        @return grid: list of rows of Checker objects
+        """
+        grid = [[Checker.Checker(".", [r, c]) for c in range(self.col)] for r in range(self.row)]
+        for color, men, kings in (("B", self.black_men, self.black_kings), ("W", self.white_men, self.white_kings)):
+            pieces = men | kings
+            while pieces:
+                low = pieces & -pieces
+                pieces ^= low
+                r, c = self.coords[low.bit_length() - 1]
+                checker = Checker.Checker(color, [r, c])
+                if kings & low:
+                    checker.become_king()
+                grid[r][c] = checker
+        return grid
+
+    def show_board(self, fh=None):
+        """
+        prints board to console or to file
+        @param fh: file object, incase we need to print to file
+        @return :
+        @raise :
+        """
+        print("   ", end="", file=fh)
+        print(*range(0, self.col), sep="  ", file=fh)
+        for i, row in enumerate(self.board):
+            print(i, end="", file=fh)
+            for checker in row:
+                if checker.is_king:
+                    print("%3s" % checker.get_color().upper(), end="", file=fh)
+                else:
+                    print("%3s" % checker.get_color().lower(), end="", file=fh)
+            print(file=fh)
+        print('----------------------', file=fh)
+
+
+if __name__ == "__main__":
+    # Plays random games on a Board and a BitBoard side by side and checks that both engines
+    # generate the same moves and agree on the winner after every move.
+    import random
+
+    games = 0
+    for row in range(3, 11):
+        for col in range(2, 11):
+            for p in range(1, row):
+                try:
+                    Board(col, row, p).check_initial_variable()
+                except Exception:
+                    continue
+                for seed in range(3):
+                    rng = random.Random(seed)
+                    board = Board(col, row, p)
+                    board.initialize_game()
+                    bitboard = BitBoard(col, row, p)
+                    bitboard.initialize_game()
+                    turn = 1
+                    while True:
+                        moves = board.get_all_possible_moves(turn)
+                        assert str(moves) == str(bitboard.get_all_possible_moves(turn)), (col, row, p, seed)
+                        if not moves:
+                            break
+                        group = rng.choice(moves)
+                        move = rng.choice(group)
+                        board.make_move(move, turn)
+                        bitboard.make_move(move, turn)
+                        assert (board.black_count, board.white_count) == (bitboard.black_count, bitboard.white_count)
+                        assert board.zobrist_key == bitboard.zobrist_key == \
+                            board.zobrist_table.key_of(board) ^ board.zobrist_table.side * (len(board.saved_move) % 2)
+                        assert board.is_win(turn) == bitboard.is_win(turn), (col, row, p, seed)
+                        for player in ("B", "W"):
+                            assert board.has_any_move(player) == bitboard.has_any_move(player) == \
+                                (len(board._generate_all_possible_moves(player)) > 0), (col, row, p, seed)
+                        if board.is_win(turn) != 0:
+                            break
+                        turn = 3 - turn
+                    while bitboard.saved_move:
+                        bitboard.undo()
+                        board.undo()
+                        assert board.zobrist_key == bitboard.zobrist_key
+                    start = BitBoard(col, row, p)
+                    start.initialize_game()
+                    assert [[(c.color, c.is_king) for c in r] for r in bitboard.board] == \
+                        [[(c.color, c.is_king) for c in r] for r in start.board]
+                    games += 1
+    print("BitBoard matches Board on", games, "games")
@@ -7,9 +7,77 @@ We are following the javadoc docstring format which is:
 @raise tag describes the errors this function can raise
 """
 from Move import Move
-from copy import deepcopy
-from copy import copy
+
+_step_tables = {}
+
+
+def get_step_table(col, row):
+    """
+    Returns the step table for a board size, creating it the first time it is asked for.
+    @param col: number of columns in the board
+    @param row: number of rows in the board
+    @return table: the StepTable shared by every board of this size
+    """
+    table = _step_tables.get((col, row))
+    if table is None:
+        table = _step_tables[(col, row)] = StepTable(col, row)
+    return table
+
+
+class StepTable():
+    """
+    Precomputed diagonal steps of every square, so move generation does not have to build direction
+    lists or check the board edges.
+    steps[color][is_king][r][c] is a tuple of (neighbor_row, neighbor_col, jump_row, jump_col) in the order
+    the checker explores its directions. Off-board neighbors are left out and jump_row is None when the
+    jump would land off the board.
+    squares[r][c] is the (r, c) tuple, shared by every move that goes through that square.
+    """
+    def __init__(self, col, row):
+        """
+        Builds the steps of every square for men and kings of both colors
+        @param col: number of columns in the board
+        @param row: number of rows in the board
+        """
+        directions = {"W": [(-1, -1), (-1, 1)], "B": [(1, -1), (1, 1)]}
+        opponent = {"W": "B", "B": "W"}
+        self.squares = [[(r, c) for c in range(col)] for r in range(row)]
+        self.steps = {}
+        for color in ("B", "W"):
+            men = directions[color]
+            kings = directions[color] + directions[opponent[color]]
+            self.steps[color] = [self.build(col, row, men), self.build(col, row, kings)]
+
+    @staticmethod
+    def build(col, row, explore_direction):
+        """
+        Builds the steps of every square for one list of directions. Internal function
+        """
+        grid = []
+        for r in range(row):
+            grid.append([])
+            for c in range(col):
+                steps = []
+                for i in explore_direction:
+                    pos_x, pos_y = r + i[0], c + i[1]
+                    if 0 <= pos_x < row and 0 <= pos_y < col:
+                        jump_x, jump_y = pos_x + i[0], pos_y + i[1]
+                        if 0 <= jump_x < row and 0 <= jump_y < col:
+                            steps.append((pos_x, pos_y, jump_x, jump_y))
+                        else:
+                            steps.append((pos_x, pos_y, None, None))
+                grid[r].append(tuple(steps))
+        return grid
+
+    def __deepcopy__(self, memo):
+        # the steps never change after __init__, copies of a board can share its table
+        return self
+
+
 class Checker():
+    # a board holds row*col checkers, slots keep each of them to four references instead of a dict
+    __slots__ = ("color", "row", "col", "is_king")
+
     def __init__(self, color, location):
         """
         Initializes Checker pieces
@@ -27,43 +95,36 @@ class Checker():
         @param board: has the current state of the board
         @return result: a list of Move objects that describes the possible move for this checker
         """
-        # determine possible move directions from the color of this checker
-        # explore_direction: a list of tuples of coordinates of possible move
-        # - current position.
+        # the directions this checker can move in come from its color and whether it is king,
+        # board.step_table already has the neighbors and jump squares of every square for them.
         # e.g. now we have a checker piece at 1,1 black. It can move to 2,0
-        # and 2,2. explore_direction will be [(1,-1), (1, 1)]
+        # and 2,2, its steps are ((2,0,None,None), (2,2,3,3)).
         if self.color == '.':
             return []
-        directions = {"W":[(-1,-1),(-1,1)],"B":[(1,-1),(1,1)]}
         result = []
         multiple_jump = []
-        board = copy(board)
         is_capture = False
-        explore_direction = directions[self.color]
-        if self.is_king:
-            explore_direction.extend(directions[board.opponent[self.color]])
-            # a king can go all directions
-            # but do we allow fly king?
-        for i in explore_direction:
-            pos_x,pos_y = self.row+i[0],self.col+i[1]
-            if board.is_in_board(pos_x,pos_y):
-                if board.board[pos_x][pos_y].color == '.':
-                    result.append(Move([(self.row,self.col),(pos_x,pos_y)]))
-        # save_color = board.board[self.row][self.col].color
-        save_color = board.board[self.row][self.col].color
-        board.board[self.row][self.col].color = "."
-        self.binary_tree_traversal(self.row,self.col,multiple_jump, board, explore_direction, [],save_color)
+        steps = board.step_table.steps[self.color][self.is_king]
+        coords = board.step_table.squares
+        squares = board.board
+        origin = coords[self.row][self.col]
+        for pos_x, pos_y, _, _ in steps[self.row][self.col]:
+            if squares[pos_x][pos_y].color == '.':
+                result.append(Move((origin, coords[pos_x][pos_y])))
+        save_color = squares[self.row][self.col].color
+        squares[self.row][self.col].color = "."
+        self.binary_tree_traversal(self.row,self.col,multiple_jump, board, steps, [],save_color)
         # filter out those at margins
         if multiple_jump != []:
             is_capture = True
             result = []
         for jump in multiple_jump:
-            jump.insert(0,(self.row,self.col))
+            jump.insert(0,origin)
             result.append(Move(jump))
-        board.board[self.row][self.col].color = save_color
+        squares[self.row][self.col].color = save_color
         return result, is_capture
 
-    def binary_tree_traversal(self,pos_x,pos_y,multiple_jump,board,direction,move,self_color):
+    def binary_tree_traversal(self,pos_x,pos_y,multiple_jump,board,steps,move,self_color):
         """
         Internal helper function for get_possible_moves. Students should not use this.
         This function handles the move chain if multiple jumps are possible for this checker piece
@@ -71,30 +132,23 @@ class Checker():
         @param pos_y: y coordinate of the checker piece whose move is being explored
         @param multiple_jump: a list of the current multiple jump moves found
         @param board: current state of the board
-        @param direction: current direction to explore in
+        @param steps: step table grid of this checker, see StepTable
         @param move: current move chain being explored
         """
-        for i in direction:
-            temp_x, temp_y = pos_x + i[0], pos_y + i[1]
-            if board.is_in_board(temp_x,temp_y) and \
-                    board.board[temp_x][temp_y].color == board.opponent[self_color] \
-                    and board.is_in_board(temp_x+i[0],temp_y+i[1]) and board.board[temp_x + i[0]][temp_y+ i[1]].color == '.':
-                break
-        else:
+        squares = board.board
+        opponent_color = board.opponent[self_color]
+        jumps = [(x, y, jump_x, jump_y) for x, y, jump_x, jump_y in steps[pos_x][pos_y]
+                 if jump_x is not None and squares[x][y].color == opponent_color and squares[jump_x][jump_y].color == '.']
+        if not jumps:
             if move != []:
                 multiple_jump.append(move)
             return
-        for i in direction:
-            temp_x,temp_y = pos_x + i[0],pos_y + i[1]
-            if board.is_in_board(temp_x,temp_y) and board.board[temp_x][temp_y].color == board.opponent[self_color]:
-
-                if board.is_in_board(pos_x + i[0]+i[0],pos_y + i[1]+i[1]) and board.board[pos_x + i[0] + i[0]][pos_y + i[1] + i[1]].color == '.':
-                    backup = board.board[pos_x + i[0]][pos_y + i[1]].color
-                    board.board[pos_x + i[0]][pos_y + i[1]].color = "."
-                    move.append((pos_x + i[0]+i[0],pos_y + i[1]+i[1]))
-                    self.binary_tree_traversal(pos_x + i[0] + i[0],pos_y + i[1] + i[1],multiple_jump,board,direction,list(move),self_color)
-                    move.pop()
-                    board.board[pos_x + i[0]][pos_y + i[1]].color = backup
+        for x, y, jump_x, jump_y in jumps:
+            squares[x][y].color = "."
+            move.append(board.step_table.squares[jump_x][jump_y])
+            self.binary_tree_traversal(jump_x,jump_y,multiple_jump,board,steps,list(move),self_color)
+            move.pop()
+            squares[x][y].color = opponent_color
     # def get_valid_moves(self, board):
     #     """
     #
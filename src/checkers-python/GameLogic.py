@@ -1,10 +1,15 @@
 from BoardClasses import *
 import sys
 sys.path.append("./AI_Extensions/")
-from AI_Extensions import *
 #from StudentAI import StudentAI
 from StudentAI import StudentAI
-from ManualAI import ManualAI
+# The AI_Extensions players and ManualAI are imported by the modes that use them, so tournament mode,
+# which is started once per game, only loads the board and StudentAI.
+
+# Tournament mode command that starts a new game in the same process, as "new_game {col} {row} {p}",
+# answered with READY once the AI for that game is set up
+NEW_GAME = "new_game"
+READY = "ready"
 
 class GameLogic:
 
@@ -48,6 +53,7 @@ class GameLogic:
             board.show_board(fh)
             if(winPlayer != 0):
                 if self.mode == 'n':#Communate with peer to tell the result.
+                    from AI_Extensions.Network_AI import NetworkAI
                     if player == 1:
                         temp_player = 2
                     else:
@@ -64,6 +70,7 @@ class GameLogic:
         else:
             print('player',winPlayer,'wins',file=fh)
         if self.mode == 'n' or self.mode == 'network' or self.mode == 'l' or self.mode == 'local':
+            from AI_Extensions.IOAI import IOAI
             for AI in self.ai_list:
                 if type(AI) is IOAI:
                     AI.close()
@@ -72,16 +79,39 @@ class GameLogic:
     def TournamentInterface(self):
         ai = StudentAI(self.col,self.row,self.p)
         while True:
-            move = Move.from_str(input().rstrip())
+            try:
+                line = input().rstrip()
+            except EOFError:
+                # the tournament closed our stdin, there are no more games
+                return
+            if line.startswith(NEW_GAME):
+                ai = self.new_game(ai, *map(int, line.split()[1:]))
+                print(READY)
+                continue
+            move = Move.from_str(line)
             result = ai.get_move(move)
             print(result)
 
+    def new_game(self,ai,col,row,p):
+        '''
+        Sets up the AI for the next game of a tournament played in this process. An AI that has a new_game
+        method and plays on the same board size keeps its object, so it can keep its tables between games.
+        Every other AI is created again, the modules it imported stay loaded either way.
+        '''
+        if (col,row,p) == (self.col,self.row,self.p) and hasattr(ai, "new_game"):
+            ai.new_game()
+            return ai
+        self.col, self.row, self.p = col, row, p
+        return StudentAI(col,row,p)
+
     '''
     The parameters should be changed DURING/AFTER the implementation of Board.
     '''
 
     def Run(self,fh=None,**kwargs):
         if self.mode == 'n' or self.mode == 'network' :
+            from AI_Extensions.IOAI import IOAI
+            from AI_Extensions.Network_AI import NetworkAI
             if kwargs['mode'] == 'host':
                 self.ai_list.append(
                     IOAI(self.col, self.row, self.p, ai_path=kwargs['ai_path'], time=kwargs['time']))
@@ -97,6 +127,7 @@ class GameLogic:
 
             self.gameloop(fh)
         elif self.mode == 'm' or self.mode == 'manual' :
+            from ManualAI import ManualAI
             if kwargs['order'] == '1':
                 self.ai_list.append(
                     ManualAI(self.col, self.row, self.p))
@@ -121,11 +152,19 @@ class GameLogic:
                     StudentAI(self.col, self.row, self.p))
             self.gameloop(fh)
         elif self.mode == 'l' or self.mode == 'local' :
+            from AI_Extensions.IOAI import IOAI
             self.ai_list.append(
                 IOAI(self.col, self.row, self.p, ai_path=kwargs['ai_path_1'], time=kwargs['time']))
             self.ai_list.append(
                 IOAI(self.col, self.row, self.p, ai_path=kwargs['ai_path_2'], time=kwargs['time']))
             return self.gameloop(fh)
+        elif self.mode == 'i' or self.mode == 'inprocess' :
+            from AI_Extensions.InProcessAI import InProcessAI
+            self.ai_list.append(
+                InProcessAI(self.col, self.row, self.p, ai_path=kwargs['ai_path_1'], time=kwargs['time']))
+            self.ai_list.append(
+                InProcessAI(self.col, self.row, self.p, ai_path=kwargs['ai_path_2'], time=kwargs['time']))
+            return self.gameloop(fh)
         elif self.mode == 't':
             self.TournamentInterface()
 
@@ -0,0 +1,71 @@
+"""
+This module has the MoveCache Class, a bounded least-recently-used cache of generated move lists used by
+Board and BitBoard so that asking for the moves of the same position again costs a dict lookup.
+
+We are following the javadoc docstring format which is:
+@param tag describes the input parameters of the function
+@return tag describes what the function returns
+@raise tag describes the errors this function can raise
+"""
+
+from collections import OrderedDict
+
+
+class MoveCache:
+    """
+    This class describes MoveCache. Entries are keyed by (zobrist key, color). The cached lists are
+    returned as they are, so callers must not modify them.
+    """
+    def __init__(self, max_size=4096):
+        """
+        Intializes an empty cache
+        @param max_size: number of positions kept before the least recently used one is dropped
+        """
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """
+        Looks up the moves of a position
+        @param key: (zobrist key, color) of the position
+        @return moves: the cached move list, or None if the position is not cached
+        """
+        moves = self.entries.get(key)
+        if moves is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return moves
+
+    def put(self, key, moves):
+        """
+        Stores the moves of a position, dropping the least recently used position if the cache is full
+        @param key: (zobrist key, color) of the position
+        @param moves: move list returned by get_all_possible_moves
+        """
+        self.entries[key] = moves
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        """
+        Empties the cache and resets the counters
+        """
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def hit_rate(self):
+        """
+        @return: fraction of lookups that were answered from the cache
+        """
+        if self.hits + self.misses == 0:
+            return 0.0
+        return self.hits / (self.hits + self.misses)
+
+    def __deepcopy__(self, memo):
+        # entries are keyed by position, so copies of a board can keep sharing one cache
+        return self
@@ -0,0 +1,122 @@
+"""
+This module has the OpeningBook Class which looks the move to play up in a file of positions searched ahead
+of time, so the first moves of a game cost a lookup instead of a whole search.
+
+A book holds the positions of one (col, row, p) configuration. The file is a header followed by one record
+per position, the zobrist_key of the position (with the player to move in it) and the Move.encode code of
+its move, sorted by key. The file is memory-mapped and searched with a binary search, so opening it reads
+nothing and a lookup touches about log2(positions) records. write_book writes a file, Tools/build_book.py
+fills one by searching the positions of the first moves of a game.
+
+We are following the javadoc docstring format which is:
+@param tag describes the input parameters of the function
+@return tag describes what the function returns
+@raise tag describes the errors this function can raise
+"""
+
+import mmap
+import os
+import struct
+
+MAGIC = b"CKBOOK1\n"
+HEADER = struct.Struct("<8s4I")  # MAGIC, col, row, p, number of records
+RECORD = struct.Struct("<QI")  # zobrist key, move code
+MAX_CODE = (1 << 32) - 1  # longest move a record holds, 8 hops, more than an opening has
+
+
+def book_path(directory, col, row, p):
+    """
+    Returns where the book of a configuration is kept
+    @param directory: directory of the books
+    @param col: number of columns in the board
+    @param row: number of rows in the board
+    @param p: number of rows filled with pieces at the start
+    @return path: e.g. directory/7x7_2.book
+    """
+    return os.path.join(directory, "%dx%d_%d.book" % (col, row, p))
+
+
+def write_book(path, col, row, p, entries):
+    """
+    Writes a book file, replacing the old one only once the new one is complete
+    @param path: file to write
+    @param col: number of columns in the board
+    @param row: number of rows in the board
+    @param p: number of rows filled with pieces at the start
+    @param entries: dict zobrist key -> Move
+    @raise ValueError: if a move is too long for a record
+    """
+    records = sorted((key, move.encode()) for key, move in entries.items())
+    for key, code in records:
+        if code > MAX_CODE:
+            raise ValueError("move code %d of position %d does not fit in a record" % (code, key))
+    temp = path + ".tmp"
+    with open(temp, "wb") as fh:
+        fh.write(HEADER.pack(MAGIC, col, row, p, len(records)))
+        for key, code in records:
+            fh.write(RECORD.pack(key, code))
+    os.replace(temp, path)
+
+
+class OpeningBook:
+    """
+    This class describes OpeningBook. probe returns the code of the move of a position, the caller decodes
+    it with its own Move class.
+    """
+    def __init__(self, path, col, row, p):
+        """
+        Maps a book file
+        @param path: book file
+        @param col: number of columns of the board the book is used for
+        @param row: number of rows of the board the book is used for
+        @param p: number of rows filled with pieces at the start
+        @raise ValueError: if the file is not a book or is the book of another configuration
+        """
+        with open(path, "rb") as fh:
+            self.data = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self.data) < HEADER.size:
+            raise ValueError(path + " is not an opening book")
+        magic, book_col, book_row, book_p, self.size = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC or len(self.data) != HEADER.size + self.size * RECORD.size:
+            raise ValueError(path + " is not an opening book")
+        if (book_col, book_row, book_p) != (col, row, p):
+            raise ValueError("%s is the book of %dx%d p=%d" % (path, book_col, book_row, book_p))
+
+    @classmethod
+    def open(cls, directory, col, row, p):
+        """
+        Opens the book of a configuration if there is one
+        @param directory: directory of the books
+        @param col: number of columns in the board
+        @param row: number of rows in the board
+        @param p: number of rows filled with pieces at the start
+        @return book: OpeningBook, or None if the configuration has no book
+        """
+        path = book_path(directory, col, row, p)
+        if not os.path.exists(path):
+            return None
+        return cls(path, col, row, p)
+
+    def __len__(self):
+        return self.size
+
+    def probe(self, key):
+        """
+        Looks a position up
+        @param key: zobrist_key of the position
+        @return code: Move.encode code of the book move, or None if the position is not in the book
+        """
+        low, high = 0, self.size
+        while low < high:
+            middle = (low + high) // 2
+            found, code = RECORD.unpack_from(self.data, HEADER.size + middle * RECORD.size)
+            if found < key:
+                low = middle + 1
+            elif found > key:
+                high = middle
+            else:
+                return code
+        return None
+
+    def close(self):
+        self.data.close()
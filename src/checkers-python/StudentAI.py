@@ -1,26 +1,44 @@
 import random
 import math
-import copy
-import hashlib
+import os
 import time
 from BoardClasses import Move
 from BoardClasses import Board
+from BitBoard import BitBoard
+
+# Set to True to search on the integer-mask BitBoard engine instead of the Checker grid Board.
+USE_BITBOARD = False
+# Plies a random playout is played for before the material count decides it.
+ROLLOUT_PLIES = 60
+# Exploration factor of the UCT selection.
+EXPLORATION = 1.0
+# Seconds of search per move. StudentAI.iterations also caps the search, but it is set high enough that this decides.
+MOVE_TIME = 5
+# Number of processes searching each move. Above 1 the root-parallel mode forks that many - 1 workers,
+# each running its own playouts from the current position, and sums their root move statistics.
+ROOT_PARALLEL_WORKERS = 1
+# Random games played from every new node at once with the NumPy BatchPlayout engine. 0 plays a single
+# game through the board instead, which does not need NumPy.
+BATCH_PLAYOUTS = 0
+# Set to False to search every move, also those in the opening book.
+OPENING_BOOK = True
+# Directory of the opening books built by Tools/build_book.py, one file per (col, row, p).
+BOOK_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "books")
+
+# numpy, BatchPlayout, multiprocessing and OpeningBook are imported by the code that uses them, so
+# tournament mode does not pay for the modes it has switched off and the flags can be changed after import.
 
 #The following part should be completed by students.
 #Students can modify anything except the class name and exisiting functions and varibles.
 
-def hash_board(board: Board) -> str:
+def hash_board(board: Board) -> int:
     """
-    Hashes the checkers board state.
+    Hashes the checkers board state. The board keeps its Zobrist key up to date in make_move and undo,
+    so this costs nothing.
     :param board: Board object
-    :return: Hash value as a hexadecimal string
+    :return: 64-bit Zobrist key of the position and side to move
     """
-    board_str = "".join(
-        f"{checker.color}{'K' if checker.is_king else ''}{checker.row}{checker.col}" 
-        for row in board
-        for checker in row
-    )
-    return hashlib.sha256(board_str.encode()).hexdigest()
+    return board.zobrist_key
 
 def valid_move(moves: list, max_move: Move) -> bool:
     """
@@ -30,9 +48,8 @@ def valid_move(moves: list, max_move: Move) -> bool:
     :return: True if valid, False otherwise
     """
     for row in moves:
-        for move in row:
-            if str(move) == str(max_move):
-                return True
+        if max_move in row:
+            return True
     return False
 
 def has_only_one_item(matrix: list) -> bool:
@@ -51,7 +68,7 @@ def has_only_one_item(matrix: list) -> bool:
 def winning(color: int, board: Board) -> bool:
     """
     Determines if the given color is winning.
-    :param color: Player color (1 for white, 2 for black)
+    :param color: Player color (1 for black, 2 for white)
     :param board: Current board state
     :return: True if winning, False otherwise
     """
@@ -62,7 +79,7 @@ def winning(color: int, board: Board) -> bool:
 
     for row in board:
         for checker in row:
-            if checker:
+            if checker.color != ".":
                 if checker.color == "W":
                     white_pieces += 1
                     if checker.is_king:
@@ -97,17 +114,41 @@ def winning(color: int, board: Board) -> bool:
     else:
         return black_score < white_score
         
+_search_args = None # (ai, start_time) read by the root-parallel workers
+
+def root_search(seed: int) -> tuple:
+    """
+    Body of a root-parallel worker. It runs in a fork of the process that called get_move, so it
+    searches the same tree, with its own random seed.
+    :param seed: Seed for this worker's playouts
+    :return: Number of playouts and a dict of root Move -> (visits, wins) added by this worker only
+    """
+    random.seed(seed)
+    ai, start_time = _search_args
+    if ai.batch is not None:
+        import numpy as np
+        ai.rng = np.random.default_rng(seed)
+    before = {child.move: (child.visits, child.wins) for child in ai.root.children}
+    count = ai.run_simulations(start_time)
+    stats = {}
+    for child in ai.root.children:
+        visits, wins = before[child.move]
+        stats[child.move] = (child.visits - visits, child.wins - wins)
+    return count, stats
+
 class MCTSNode:
+    __slots__ = ("parent", "move", "color", "children", "untried", "terminal", "winner", "visits", "wins")
+
     def __init__(self, parent=None, move=None, color=None):
         self.parent = parent
         self.move = move
-        self.color = color
-        self.children = set()
+        self.color = color # player who made the move leading to this node
+        self.children = [] # expanded children
+        self.untried = None # moves not expanded yet, filled in the first time the node is expanded
         self.terminal = False
+        self.winner = None # is_win result of a terminal node
         self.visits = 0
-        self.wins = 0
-        self.limited = False
-        self.winner = None
+        self.wins = 0 # playouts won by self.color, a tie counts half
 
     def uct(self,  num_parent_simulations: int, exploration_weight: float = 1.0) -> float:
         """
@@ -120,35 +161,47 @@ class MCTSNode:
             return float('inf')
         return (self.wins/ self.visits) + exploration_weight * (math.sqrt(math.log(num_parent_simulations) / self.visits))
 
+    def fully_expanded(self) -> bool:
+        """
+        :return: True if every move of this node has a child
+        """
+        return self.untried is not None and not self.untried
+
+    def find_child(self, move: Move):
+        """
+        Finds the child reached by a move.
+        :param move: Move to look for
+        :return: The child, None if that move has not been expanded
+        """
+        for child in self.children:
+            if child.move == move:
+                return child
+        return None
+
 class StudentAI():
     def __init__(self, col, row, p):
         self.col = col
         self.row = row
         self.p = p
-        self.board = Board(col,row,p)
+        self.board = BitBoard(col,row,p) if USE_BITBOARD else Board(col,row,p)
         self.board.initialize_game()
         self.opponent = {1:2,2:1}
         self.color = 2
-        self.visited = {}
-        self.stack = [] # odd length for player win, even length for opponent win
-        self.terminal_nodes = 0
         self.root = None
-        self.iterations = 1000
-        self.leaves = 0
-        self.cycles = 0
-        self.limit_reached = 0
-        self.move = None
-        self.prev_node = None
-
-    def make_terminal(self, node: MCTSNode) -> None:
-        """
-        Makes node terminal.
-        :param node: Node to make terminal
-        """
-        self.terminal_nodes += 1
-        node.terminal = True
-        node.wins = 1
-        node.visits = 1
+        self.iterations = 1000000 # search iterations per move at most, so that MOVE_TIME decides when to stop
+        self.last_move = None # our move of the previous turn, to find the reused subtree
+        self.simulations = 0 # playouts run for the last move
+        self.batch = None
+        self.rng = None
+        if BATCH_PLAYOUTS:
+            import numpy as np
+            from BatchPlayout import BatchPlayout
+            self.batch = BatchPlayout(col, row, self.board.tie_max)
+            self.rng = np.random.default_rng()
+        self.book = None
+        if OPENING_BOOK:
+            from OpeningBook import OpeningBook
+            self.book = OpeningBook.open(BOOK_DIR, col, row, p)
 
     def random_move(self, moves: list) -> Move:
         """
@@ -162,101 +215,253 @@ class StudentAI():
         inner_index = random.randint(0, len(moves[index]) - 1)
         return moves[index][inner_index]
 
-    def simulate_turn(self, board: Board, color: int) -> MCTSNode:
-        """
-        Simulates a turn in the game.
-        :param board: Current board state
-        :param color: Player color
-        :return: Node representing the result of the turn
-        """
-        is_win = board.is_win(color)
-        moves = board.get_all_possible_moves(color)
-        hashed = hash_board(board.board)
-            
-        if (not moves or is_win != 0):
-            node = self.prev_node
-            self.make_terminal(node)
-            node.wins = int(is_win == color)
+    def selection(self, board: Board) -> MCTSNode:
+        """
+        Walks down the tree from the root, picking the child with the highest UCT value while the
+        node is fully expanded, and plays the moves on the board.
+        :param board: Board at the root, the moves are left played on it
+        :return: Node to expand
+        """
+        node = self.root
+        while not node.terminal and node.fully_expanded() and node.children:
+            parent_visits = node.visits
+            node = max(node.children, key=lambda child: child.uct(parent_visits, EXPLORATION))
+            board.make_move(node.move, node.color)
+        return node
+
+    def expansion(self, node: MCTSNode, board: Board) -> MCTSNode:
+        """
+        Adds one untried move of the node to the tree and plays it on the board.
+        :param node: Node returned by selection
+        :param board: Board at that node
+        :return: The new child, or the node itself if it is terminal
+        """
+        if node.terminal:
             return node
+        color = self.opponent[node.color]
+        if node.untried is None:
+            node.untried = [move for row in board.get_all_possible_moves(color) for move in row]
+            if not node.untried:
+                # the player to move is stuck, the one who just moved wins
+                node.terminal = True
+                node.winner = node.color
+                return node
+        move = node.untried.pop(random.randint(0, len(node.untried) - 1))
+        return self.add_child(node, move, board)
 
-        move = self.random_move(moves)
+    def add_child(self, node: MCTSNode, move: Move, board: Board) -> MCTSNode:
+        """
+        Plays a move on the board and adds its child node, marking it terminal if the game ends there.
+        :param node: Parent node
+        :param move: Move of the player to move at node
+        :param board: Board at node, the move is left played on it
+        :return: The new child
+        """
+        color = self.opponent[node.color]
         board.make_move(move, color)
-        hashed = hash_board(board.board)
-
-        if self.move is None: # capture our ititial move
-            self.move = move
-
-        if (hashed in self.visited):
-            i = 0
-            while hashed in self.stack and i < 10:
-                board.undo()
-                move = self.random_move(moves)
-                board.make_move(move, color)
-                hashed = hash_board(board.board)
-                i += 1
-
-            if hashed in self.stack and i == 10:
-                board.undo()
-                node = self.prev_node
-                self.make_terminal(node)
-                return node
+        child = MCTSNode(parent=node, move=move, color=color)
+        result = board.is_win(color)
+        if result != 0:
+            child.terminal = True
+            child.winner = result
+        node.children.append(child)
+        return child
 
-        if (hashed not in self.visited):
-            self.visited[hashed] = MCTSNode(color=color, move=move)
+    def simulation(self, board: Board, color: int) -> int:
+        """
+        Plays random moves until the game ends or ROLLOUT_PLIES are played, then the material count decides.
+        :param board: Board at the node being simulated, it is played on
+        :param color: Player to move
+        :return: Winning player, or -1 for a tie
+        """
+        for _ in range(ROLLOUT_PLIES):
+            moves = board.get_all_possible_moves(color)
+            if not moves:
+                return self.opponent[color]
+            board.make_move(self.random_move(moves), color)
+            result = board.is_win(color)
+            if result != 0:
+                return result
+            color = self.opponent[color]
+        if winning(self.color, board.board):
+            return self.color
+        if winning(self.opponent[self.color], board.board):
+            return self.opponent[self.color]
+        return -1
 
-        self.visited[hashed].parent = self.stack[-1] 
-        self.prev_node = MCTSNode(color=color, move=move)
-        self.stack.append(hashed)
-        return None
+    def batch_simulation(self, board: Board, color: int) -> dict:
+        """
+        Plays BATCH_PLAYOUTS random games from the board at once, games still going after ROLLOUT_PLIES
+        are decided by material.
+        :param board: Board at the node being simulated, it is not changed
+        :param color: Player to move
+        :return: Dict of winning player (-1 for a tie) -> number of games
+        """
+        import numpy as np
+        positions = np.repeat(self.batch.encode(board)[None], BATCH_PLAYOUTS, axis=0)
+        results, final = self.batch.play(positions, color, ROLLOUT_PLIES, self.rng, board.tie_counter)
+        unfinished = results == 0
+        if unfinished.any():
+            # like simulation, the games still going are decided by the material they ended with
+            results[unfinished] = self.batch.leader(final[unfinished])
+        return {player: int((results == player).sum()) for player in (1, 2, -1)}
 
-    def simulation(self):
-        copy_board = copy.deepcopy(self.board)
-      
-        for _ in range(30):
-            res = self.simulate_turn(copy_board, self.color)
-            if res is not None:
-                self.leaves += 1
-                return res
-            
-            res = self.simulate_turn(copy_board, self.opponent[self.color])
-            if res is not None:
-                self.leaves += 1
-                return res 
-
-        node = self.visited[self.stack[-1]]
-        self.make_terminal(node)
-        
-        if (winning(self.color, copy_board.board)):
-            if node.color != self.color:
-                node.wins = 0
+    def backpropagation(self, node: MCTSNode, winner: int) -> None:
+        """
+        Adds the result of a playout to the node and all its ancestors.
+        :param node: Node the playout started from
+        :param winner: Winning player, or -1 for a tie
+        """
+        while node is not None:
+            node.visits += 1
+            if winner == node.color:
+                node.wins += 1
+            elif winner == -1:
+                node.wins += 0.5
+            node = node.parent
+
+    def backpropagate_results(self, node: MCTSNode, results: dict) -> None:
+        """
+        Adds the results of a batch of playouts to the node and all its ancestors.
+        :param node: Node the playouts started from
+        :param results: Dict of winning player (-1 for a tie) -> number of games
+        """
+        games = sum(results.values())
+        while node is not None:
+            node.visits += games
+            node.wins += results[node.color] + 0.5 * results[-1]
+            node = node.parent
+
+    def reuse_root(self, move: Move) -> MCTSNode:
+        """
+        Finds the node of the current position in the tree kept from the last turn, reached by our last
+        move and the opponent's reply, and detaches it so the rest of the old tree can be freed.
+        :param move: The opponent's reply
+        :return: The new root, a fresh node if the position was not in the tree
+        """
+        node = self.root
+        for played in (self.last_move, move):
+            if node is None or played is None or len(played) == 0:
+                return MCTSNode(color=self.opponent[self.color])
+            node = node.find_child(played)
+        if node is None:
+            return MCTSNode(color=self.opponent[self.color])
+        node.parent = None
+        return node
+
+    def expand_root(self, moves: list) -> None:
+        """
+        Gives the root a child for every legal move, so the root statistics of all processes line up.
+        :param moves: Legal moves of the current position
+        """
+        for row in moves:
+            for move in row:
+                if self.root.find_child(move) is None:
+                    self.add_child(self.root, move, self.board)
+                    self.board.undo()
+        self.root.untried = []
+
+    def run_simulations(self, start_time: float) -> int:
+        """
+        Runs selection, expansion, simulation and backpropagation from the root until the iteration
+        or time budget is used up.
+        :param start_time: time.time() when the search of this move started
+        :return: Number of playouts run
+        """
+        count = 0
+        for _ in range(self.iterations):
+            if time.time() - start_time > MOVE_TIME:
+                break
+            # the playout is played on the game board itself and taken back afterwards, instead of on a copy
+            ply = self.board.snapshot()
+            results = None
+            try:
+                node = self.expansion(self.selection(self.board), self.board)
+                if node.terminal:
+                    winner = node.winner
+                elif self.batch is not None:
+                    results = self.batch_simulation(self.board, self.opponent[node.color])
+                else:
+                    winner = self.simulation(self.board, self.opponent[node.color])
+            finally:
+                self.board.restore(ply)
+            if results is not None:
+                self.backpropagate_results(node, results)
+                count += BATCH_PLAYOUTS
+            else:
+                self.backpropagation(node, winner)
+                count += 1
+        return count
+
+    def parallel_simulations(self, start_time: float) -> int:
+        """
+        Root-parallel version of run_simulations. Forks ROOT_PARALLEL_WORKERS - 1 workers that run
+        root_search while this process runs its own playouts, then adds the workers' root statistics
+        to the root children. Falls back to run_simulations where fork is not available.
+        :return: Number of playouts run by all the processes
+        """
+        global _search_args
+        # only the root-parallel mode needs it, and it is the slowest import of this module
+        import multiprocessing
+        try:
+            context = multiprocessing.get_context("fork")
+        except ValueError:
+            return self.run_simulations(start_time)
+        _search_args = (self, start_time)
+        seeds = [random.getrandbits(32) for _ in range(ROOT_PARALLEL_WORKERS - 1)]
+        with context.Pool(ROOT_PARALLEL_WORKERS - 1) as pool:
+            pending = pool.map_async(root_search, seeds, chunksize=1)
+            count = self.run_simulations(start_time)
+            children = {child.move: child for child in self.root.children}
+            for worker_count, stats in pending.get():
+                count += worker_count
+                for move, (visits, wins) in stats.items():
+                    children[move].visits += visits
+                    children[move].wins += wins
+                    self.root.visits += visits
+        _search_args = None
+        return count
+
+    def new_game(self) -> None:
+        """
+        Gets ready for another game on the same board, when a tournament plays several games in one process.
+        The move cache of the board is kept, since positions of the last game come up again.
+        """
+        move_cache = self.board.move_cache
+        self.board = BitBoard(self.col,self.row,self.p) if USE_BITBOARD else Board(self.col,self.row,self.p)
+        self.board.initialize_game()
+        self.board.move_cache = move_cache
+        self.color = 2
+        self.root = None
+        self.last_move = None
+        self.simulations = 0
+
+    def book_move(self, moves: list) -> Move:
+        """
+        Looks the current position up in the opening book.
+        :param moves: Legal moves of the current position
+        :return: The book move, or None if the position is not in the book
+        """
+        code = self.book.probe(hash_board(self.board))
+        if code is None:
+            return None
+        move = Move.decode(code)
+        # a book built by another version of the engine could hold a move that is not legal here
+        return move if valid_move(moves, move) else None
+
+    def search(self, moves: list) -> Move:
+        """
+        Runs the MCTS search of the current position from self.root.
+        :param moves: Legal moves of the current position, more than one
+        :return: The most visited move, the one the search trusts most
+        """
+        self.expand_root(moves)
+        start_time = time.time()
+        if ROOT_PARALLEL_WORKERS > 1:
+            self.simulations = self.parallel_simulations(start_time)
         else:
-            if node.color == self.color:
-                node.wins = 0
-        return node 
-
-    def backpropagation(self, starting_board):
-        def add_child(nh, ch):
-            node = self.visited[nh]        
-            if node.limited:
-                node.terminal = False
-            node.children.add(ch)
-
-            node.visits = 0
-            node.wins = 0
-            wins = 0
-            for c in node.children:
-                child_node = self.visited[c]
-                node.visits += child_node.visits
-                wins += child_node.wins
-            node.wins = node.visits - wins
-
-        while self.stack:
-            # if self.stack[-1] != starting_board:
-            #     self.board.undo()
-            top = self.stack.pop()
-            
-            if self.stack:
-                add_child(self.stack[-1], top)
+            self.simulations = self.run_simulations(start_time)
+        return max(self.root.children, key=lambda child: child.visits).move
 
     def get_move(self, move: Move) -> Move:
         if len(move) != 0:
@@ -264,87 +469,53 @@ class StudentAI():
         else:
             self.color = 1
 
+        self.root = self.reuse_root(move)
         moves = self.board.get_all_possible_moves(self.color)
-        temp = hash_board(self.board.board)
-        root = MCTSNode(color=self.color, move=None)
-        max_move = self.random_move(moves)
 
         if has_only_one_item(moves):
             max_move = moves[0][0]
         else:
-            if temp not in self.visited:
-                self.visited[temp] = root
-            self.prev_node = root
-            board_moves = {}
-            for row in moves:
-                for move in row:
-                    board_moves[str(move)] = MCTSNode(color=self.color, move=move)
-            
-            start_time = time.time()
-            for _ in range(self.iterations):
-                if time.time() - start_time > 5:
-                    break
-                self.move = None
-                self.stack = [temp]
-                res = self.simulation()
-                # print(f"Color: {res.color} | wins: {res.wins} | Limited: {res.limited} ")
-
-                # "backpropogation"
-                node = board_moves[str(self.move)]
-                node.visits += 1
-
-                if res.color == self.color:
-                    node.wins += res.wins
-
-            max_uct = float("-inf")
-            for move in board_moves:
-                node = board_moves[move]
-                uct = node.uct(self.iterations)
-                if uct > max_uct:
-                    max_uct = uct
-                    max_move = node.move
-            """
-            print()
-            print(f"Playing as {self.color}")
-            explored, wins = 0, 0
-            for c in board_moves:
-                if board_moves[c].visits > 0:
-                    node = board_moves[c]
-                    print(f"{c} {node.uct(500)}, Wins: {node.wins} | Visits: {node.visits}")
-                    if node.visits > 0:
-                        explored += node.visits
-                    wins += node.wins
-            print(f"Explored: {explored} | Wins: {wins}") 
-            print(self.board.get_all_possible_moves(self.color))
-                self.backpropagation(temp)
-            
-            print(f"Time: {time.time() - start_time} | Iterations: {self.leaves} | limit_reached: {self.limit_reached}")
-            print(f"White: {self.limit_white} | Black: {self.limit_black}")
-            max_uct = -1
-            for c in root.children:
-                node = self.visited[c]
-                uct = node.uct(self.iterations)
-                if uct > max_uct:  
-                    max_move = node.move
-                    max_uct =  uct
-            
-        print(f"Playing as {self.color}")
-        print(f"original board {temp} Same? {temp == hash_board(self.board.board)}")
-        print(f"Root Wins: {self.win_count} {root.wins} | Visits: {root.visits}")
-        print(f"Cycles: {self.cycles}, Leaves: {self.leaves}")
-        for c in root.children:
-            node = self.visited[c]
-            print(f" Wins: {node.wins} | Visits: {node.visits}")
-        
-        repeats = 0
-        for n1 in self.visited:
-            inst = 0
-            for n2 in self.visited:
-                if n1 in self.visited[n2].children:
-                    inst += 1
-            if inst > 1:
-                repeats += 1
-        print(f"Repeats: {repeats}")
-        """
+            max_move = self.book_move(moves) if self.book is not None else None
+            if max_move is None:
+                max_move = self.search(moves)
+            else:
+                self.simulations = 0
+
         self.board.make_move(max_move,self.color)
-        return max_move
\ No newline at end of file
+        self.last_move = max_move
+        return max_move
+
+if __name__ == "__main__":
+    import copy
+
+    # Micro-benchmark of the playout setup: a deep copy of the board per playout against playing on the
+    # game board and restoring it. The same seed gives both the same tree and the same playouts.
+    for engine in (Board, BitBoard):
+        for setup in ("deepcopy", "restore"):
+            random.seed(0)
+            ai = StudentAI(8, 8, 3)
+            ai.board = engine(8, 8, 3)
+            ai.board.initialize_game()
+            ai.color = 1
+            ai.root = MCTSNode(color=2)
+            ai.expand_root(ai.board.get_all_possible_moves(1))
+            copy_time = 0.0
+            start = time.perf_counter()
+            for _ in range(500):
+                if setup == "deepcopy":
+                    copy_start = time.perf_counter()
+                    board = copy.deepcopy(ai.board)
+                    copy_time += time.perf_counter() - copy_start
+                    node = ai.expansion(ai.selection(board), board)
+                    winner = node.winner if node.terminal else ai.simulation(board, ai.opponent[node.color])
+                else:
+                    ply = ai.board.snapshot()
+                    node = ai.expansion(ai.selection(ai.board), ai.board)
+                    winner = node.winner if node.terminal else ai.simulation(ai.board, ai.opponent[node.color])
+                    copy_start = time.perf_counter()
+                    ai.board.restore(ply)
+                    copy_time += time.perf_counter() - copy_start
+                ai.backpropagation(node, winner)
+            total = time.perf_counter() - start
+            print("%-8s %-8s 500 playouts in %.2fs, setup/restore %.1f us per playout"
+                  % (engine.__name__, setup, total, copy_time / 500 * 1e6))
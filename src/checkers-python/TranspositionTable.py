@@ -0,0 +1,117 @@
+"""
+This module has the TranspositionTable Class which remembers the result of searching a position so an
+alpha-beta search does not search it again when another move order reaches it.
+
+Positions are identified by the zobrist_key kept by Board and BitBoard, so the table can be used by any
+searcher built on either engine.
+
+We are following the javadoc docstring format which is:
+@param tag describes the input parameters of the function
+@return tag describes what the function returns
+@raise tag describes the errors this function can raise
+"""
+
+# bound types of a stored score
+EXACT = 0  # the score is the value of the position
+LOWER = 1  # the search failed high, the value is at least the score
+UPPER = 2  # the search failed low, the value is at most the score
+
+ENTRY_SIZE = 200  # rough number of bytes one stored entry costs in CPython
+
+
+class TranspositionTable:
+    """
+    This class describes TranspositionTable. Every bucket has two slots: a depth-preferred slot that keeps
+    the deepest search of the current move, and an always-replace slot that takes everything else. An entry
+    is a tuple (key, depth, bound, score, best_move, generation).
+    """
+    def __init__(self, max_bytes=32 * 1024 * 1024):
+        """
+        Intializes an empty table
+        @param max_bytes: memory cap of the table, the number of buckets is derived from it
+        """
+        self.buckets = max(1, max_bytes // ENTRY_SIZE // 2)
+        self.deep = [None] * self.buckets
+        self.recent = [None] * self.buckets
+        self.generation = 0
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+
+    def new_search(self):
+        """
+        Marks the start of a new search. Depth-preferred entries of older searches can then be
+        replaced by shallower ones.
+        """
+        self.generation += 1
+
+    def clear(self):
+        """
+        Empties the table and resets the counters
+        """
+        self.deep = [None] * self.buckets
+        self.recent = [None] * self.buckets
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+
+    def probe(self, key):
+        """
+        Looks a position up
+        @param key: zobrist key of the position
+        @return entry: the stored (key, depth, bound, score, best_move, generation) tuple, or None
+        """
+        self.probes += 1
+        i = key % self.buckets
+        entry = self.deep[i]
+        if entry is None or entry[0] != key:
+            entry = self.recent[i]
+            if entry is None or entry[0] != key:
+                return None
+        self.hits += 1
+        return entry
+
+    def store(self, key, depth, bound, score, best_move=None):
+        """
+        Stores the result of searching a position
+        @param key: zobrist key of the position
+        @param depth: remaining depth the position was searched to
+        @param bound: EXACT, LOWER or UPPER
+        @param score: score the search returned
+        @param best_move: the move that produced the score, if any
+        """
+        self.stores += 1
+        i = key % self.buckets
+        entry = (key, depth, bound, score, best_move, self.generation)
+        deep = self.deep[i]
+        if deep is None or deep[0] == key or depth >= deep[1] or deep[5] != self.generation:
+            self.deep[i] = entry
+        else:
+            self.recent[i] = entry
+
+    def lookup(self, key, depth, alpha, beta):
+        """
+        Probes a position for an alpha-beta node
+        @param key: zobrist key of the position
+        @param depth: remaining depth the node is going to be searched to
+        @param alpha: lower end of the search window
+        @param beta: upper end of the search window
+        @return score, best_move: score is None unless the stored result is deep enough and decides the
+                                  node for this window, best_move is None if the position is not stored
+        """
+        entry = self.probe(key)
+        if entry is None:
+            return None, None
+        _, stored_depth, bound, score, best_move, _ = entry
+        if stored_depth >= depth:
+            if bound == EXACT or (bound == LOWER and score >= beta) or (bound == UPPER and score <= alpha):
+                return score, best_move
+        return None, best_move
+
+    def hit_rate(self):
+        """
+        @return: fraction of probes that found their position
+        """
+        if self.probes == 0:
+            return 0.0
+        return self.hits / self.probes
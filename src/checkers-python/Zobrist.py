@@ -0,0 +1,76 @@
+"""
+This module has the ZobristTable Class which gives every (color, king, square) combination a random
+64-bit number. The key of a position is the xor of the numbers of its pieces, so a move only has to
+xor out the squares it empties and xor in the squares it fills.
+
+We are following the javadoc docstring format which is:
+@param tag describes the input parameters of the function
+@return tag describes what the function returns
+@raise tag describes the errors this function can raise
+"""
+
+import random
+
+_tables = {}
+
+
+def get_table(col, row):
+    """
+    Returns the table for a board size, creating it the first time it is asked for.
+    @param col: number of columns in the board
+    @param row: number of rows in the board
+    @return table: the ZobristTable shared by every board of this size
+    """
+    table = _tables.get((col, row))
+    if table is None:
+        table = _tables[(col, row)] = ZobristTable(col, row)
+    return table
+
+
+class ZobristTable:
+    """
+    This class describes ZobristTable. The random numbers are seeded from the board size, so every
+    process playing on the same board size computes the same keys.
+    """
+    def __init__(self, col, row):
+        """
+        Intializes the random numbers for a board size
+        @param col: number of columns in the board
+        @param row: number of rows in the board
+        """
+        self.col = col
+        self.row = row
+        rng = random.Random(col * 1000 + row)
+        # pieces[color][is_king][r*col+c]
+        self.pieces = {}
+        for color in ("B", "W"):
+            self.pieces[color] = [[rng.getrandbits(64) for _ in range(col * row)] for _ in range(2)]
+        self.side = rng.getrandbits(64)  # xored in after every move, so the side to move is part of the key
+
+    def piece(self, color, is_king, r, c):
+        """
+        Returns the number of one piece on one square
+        @param color: 'B' or 'W'
+        @param is_king: True if the piece is a king
+        @param r: row of the square
+        @param c: col of the square
+        @return: 64-bit int
+        """
+        return self.pieces[color][is_king][r * self.col + c]
+
+    def key_of(self, board):
+        """
+        Computes the key of a board from scratch by walking all the squares
+        @param board: Board or BitBoard, only its board grid is read
+        @return key: 64-bit int, without the side to move
+        """
+        key = 0
+        for r, row in enumerate(board.board):
+            for c, checker in enumerate(row):
+                if checker.color != ".":
+                    key ^= self.pieces[checker.color][checker.is_king][r * self.col + c]
+        return key
+
+    def __deepcopy__(self, memo):
+        # the numbers never change after __init__, copies of a board can share its table
+        return self